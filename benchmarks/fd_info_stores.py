@@ -0,0 +1,62 @@
+"""
+Compare the time taken by long term stores for churn around min_age, where each FdInfo is
+created and then deleted shortly afterwards. Stores are flushed every batch_size cycles, as the
+tracker does once each time its worker wakes.
+
+Usage: python -m benchmarks.fd_info_stores [num_fd_infos...] [--batch-size N]
+"""
+
+import argparse
+from datetime import datetime
+from pathlib import Path
+import time
+from tempfile import TemporaryDirectory
+
+from fdleaky.dir_fd_info_store import DirFdInfoStore
+from fdleaky.fd_info import FdInfo
+from fdleaky.segment_log_fd_info_store import SegmentLogFdInfoStore
+from fdleaky.sqlite_fd_info_store import SqliteFdInfoStore
+
+STACK = [f'  File "/app/module_{i}.py", line {i}, in function_{i}\n' for i in range(20)]
+STORE_FACTORIES = {
+    "DirFdInfoStore": lambda temp_dir: DirFdInfoStore(dir=temp_dir),
+    "SegmentLogFdInfoStore": lambda temp_dir: SegmentLogFdInfoStore(dir=temp_dir),
+    "SqliteFdInfoStore": lambda temp_dir: SqliteFdInfoStore(
+        path=temp_dir / "fdleaky.db"
+    ),
+}
+
+
+def churn(store, num_fd_infos: int, batch_size: int) -> float:
+    started = time.perf_counter()
+    for index in range(num_fd_infos):
+        fd_info = FdInfo(identifier=STACK[-1], stack=STACK, created_at=datetime.now())
+        store.create(fd_info)
+        store.delete(fd_info.id)
+        if index % batch_size == 0:
+            store.flush()
+    store.flush()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "num_fd_infos", nargs="*", type=int, default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+    for num_fd_infos in args.num_fd_infos:
+        print(f"{num_fd_infos} create/delete cycles")
+        for name, store_factory in STORE_FACTORIES.items():
+            with TemporaryDirectory() as temp_dir:
+                store = store_factory(Path(temp_dir))
+                elapsed = churn(store, num_fd_infos, args.batch_size)
+                store.close()
+            print(
+                f"{name:>22}: {elapsed:8.2f} s, {elapsed / num_fd_infos * 1e6:8.2f} us per cycle"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Compare finding the identifier for a stack by scanning each frame for each include string with
+the compiled and memoized FdInfoFactory.get_identifier.
+
+Usage: python -m benchmarks.identifier_matcher [num_lookups]
+"""
+
+import sys
+import time
+
+from fdleaky.fd import Fd
+from fdleaky.fd_info_factory import FdInfoFactory
+from fdleaky.stack import stack_table
+
+INCLUDES = [f"/app/package_{i}/" for i in range(50)]
+NUM_STACKS = 100
+
+
+def scan_identifier(stack: list[str], includes: list[str]) -> str | None:
+    """The approach previously used by get_identifier"""
+    return next(
+        (frame for frame in reversed(stack) if any(i in frame for i in includes)), None
+    )
+
+
+def main():
+    num_lookups = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    fds = []
+    for index in range(NUM_STACKS):
+        frames = tuple(
+            f'  File "/usr/lib/python3/module_{index}_{depth}.py", line {depth}, in f\n'
+            for depth in range(40)
+        ) + (f'  File "/app/package_{index % 60}/main.py", line 1, in main\n',)
+        fds.append(Fd(None, stack_table.intern(frames)))
+    factory = FdInfoFactory(min_age=0, identifier_include_any_of=INCLUDES)
+
+    started = time.perf_counter()
+    for index in range(num_lookups):
+        scan_identifier(fds[index % NUM_STACKS].stack, INCLUDES)
+    scan_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for index in range(num_lookups):
+        factory.get_identifier(fds[index % NUM_STACKS])
+    compiled_elapsed = time.perf_counter() - started
+
+    print(f"{len(INCLUDES)} include strings, 41 frames, {NUM_STACKS} distinct stacks")
+    print(f"    scan: {scan_elapsed / num_lookups * 1e6:8.2f} us per lookup")
+    print(f"compiled: {compiled_elapsed / num_lookups * 1e6:8.2f} us per lookup")
+
+
+if __name__ == "__main__":
+    main()
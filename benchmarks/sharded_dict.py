@@ -0,0 +1,101 @@
+"""
+Multithreaded stress test comparing the throughput of short term stores as the number of threads
+opening and closing file descriptors increases. Throughput can only scale across cores on a free
+threaded build of python - with the GIL, this shows the cost of the locks instead.
+
+Usage: python -m benchmarks.sharded_dict [ops_per_thread]
+"""
+
+import os
+import socket
+import sys
+from threading import Barrier, Lock, Thread
+import time
+
+from benchmarks.tracker_overhead import NullFdInfoStore
+from fdleaky.fd_tracker import FdTracker
+from fdleaky.sharded_dict import ShardedDict
+
+
+class LockedDict(dict):
+    """A dict guarded by a single lock, as a baseline for the sharded dict"""
+
+    def __init__(self):
+        super().__init__()
+        self._lock = Lock()
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            super().__setitem__(key, value)
+
+    def pop(self, key, *args):
+        with self._lock:
+            return super().pop(key, *args)
+
+
+def run_threads(num_threads: int, target) -> float:
+    barrier = Barrier(num_threads + 1)
+
+    def run():
+        barrier.wait()
+        target()
+
+    threads = [Thread(target=run) for _ in range(num_threads)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def store_stress(store, ops_per_thread: int):
+    def target():
+        subjects = [object() for _ in range(64)]
+        for index in range(ops_per_thread):
+            key = id(subjects[index & 63])
+            store[key] = index
+            store.pop(key, None)
+
+    return target
+
+
+def tracker_stress(ops_per_thread: int):
+    def target():
+        for _ in range(ops_per_thread):
+            socket.socket().close()
+
+    return target
+
+
+def main():
+    ops_per_thread = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"{os.cpu_count()} cpus, GIL {'enabled' if gil_enabled else 'disabled'}")
+    for num_threads in (1, 2, 4, 8):
+        print(f"{num_threads} threads (Millions of set/pop per second)")
+        for name, store_type in (
+            ("dict", dict),
+            ("LockedDict", LockedDict),
+            ("ShardedDict", ShardedDict),
+        ):
+            elapsed = run_threads(
+                num_threads, store_stress(store_type(), ops_per_thread)
+            )
+            rate = num_threads * ops_per_thread / elapsed / 1e6
+            print(f"  {name:>12}: {rate:6.2f}")
+        for name, store_type in (("dict", dict), ("ShardedDict", ShardedDict)):
+            tracker = FdTracker(
+                long_term_store=NullFdInfoStore(), short_term_store=store_type()
+            )
+            with tracker:
+                elapsed = run_threads(num_threads, tracker_stress(ops_per_thread // 10))
+            rate = num_threads * (ops_per_thread // 10) / elapsed / 1e3
+            print(
+                f"  tracker {name:>12}: {rate:6.1f} thousand socket open/close per second"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Compare the overhead added to each open by the tracker, with and without the event ring.
+
+Usage: python -m benchmarks.tracker_overhead [num_opens]
+"""
+
+import os
+import socket
+import sys
+import time
+from tempfile import TemporaryDirectory
+
+from fdleaky.fd_tracker import FdTracker
+from fdleaky.fd_info_store import FdInfoStore
+
+
+class NullFdInfoStore(FdInfoStore):
+    def create(self, fd_info):
+        pass
+
+    def delete(self, stored_id: str) -> bool:
+        return False
+
+
+CONFIGURATIONS = {
+    "default": {},
+    "event ring": {"event_ring_size": 1 << 16},
+}
+
+
+def open_sockets(num_opens: int, _path: str) -> float:
+    started = time.perf_counter()
+    for _ in range(num_opens):
+        socket.socket().close()
+    return time.perf_counter() - started
+
+
+def open_files(num_opens: int, path: str) -> float:
+    started = time.perf_counter()
+    for _ in range(num_opens):
+        open(path, "rb").close()  # pylint: disable=R1732
+    return time.perf_counter() - started
+
+
+def main():
+    num_opens = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    with TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "file")
+        with open(path, "wb"):
+            pass
+        for name, operation in (("socket", open_sockets), ("file", open_files)):
+            baseline = operation(num_opens, path)
+            print(
+                f"{name}: {baseline / num_opens * 1e6:.2f} us per open/close untracked"
+            )
+            for config_name, kwargs in CONFIGURATIONS.items():
+                tracker = FdTracker(long_term_store=NullFdInfoStore(), **kwargs)
+                with tracker:
+                    elapsed = operation(num_opens, path)
+                overhead = (elapsed - baseline) / num_opens * 1e6
+                print(f"  {config_name:>12}: +{overhead:.2f} us per open/close")
+
+
+if __name__ == "__main__":
+    main()
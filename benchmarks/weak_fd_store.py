@@ -0,0 +1,54 @@
+"""
+Measure the memory and insert time which a WeakFdStore costs over the default dict short term
+store, in return for not keeping subjects alive.
+
+Usage: python -m benchmarks.weak_fd_store [num_fds]
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+
+from fdleaky.weak_fd_store import WeakFdStore
+from fdleaky.fd import Fd
+from fdleaky.stack import stack_table
+
+
+class Subject:
+    """Stand in for a file or socket object"""
+
+
+def measure(store_factory, num_fds: int):
+    stack_ids = [stack_table.intern((f"site {i % 10}",)) for i in range(num_fds)]
+    gc.collect()
+    tracemalloc.start()
+    subjects = [Subject() for _ in range(num_fds)]
+    subjects_size, _ = tracemalloc.get_traced_memory()
+    started = time.perf_counter()
+    store = store_factory()
+    for subject, stack_id in zip(subjects, stack_ids):
+        store[id(subject)] = Fd(subject, stack_id)
+    elapsed = time.perf_counter() - started
+    total_size, _ = tracemalloc.get_traced_memory()
+    del subjects
+    gc.collect()
+    retained_size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return total_size - subjects_size, retained_size, elapsed
+
+
+def main():
+    num_fds = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    print(f"{num_fds} tracked fds (Timings include tracemalloc overhead)")
+    for name, store_factory in (("dict", dict), ("WeakFdStore", WeakFdStore)):
+        store_size, retained_size, elapsed = measure(store_factory, num_fds)
+        print(
+            f"{name:>16}: {store_size / num_fds:6.1f} bytes/fd in store, "
+            f"{retained_size / num_fds:6.1f} bytes/fd retained after subjects are released, "
+            f"{elapsed / num_fds * 1e9:6.0f} ns/insert"
+        )
+
+
+if __name__ == "__main__":
+    main()
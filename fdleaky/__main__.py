@@ -6,19 +6,39 @@ from pathlib import Path
 
 from uvicorn.main import main as uvicorn_main
 
+from fdleaky.dump_triggers import install_signal_handler, start_keypress_listener
 from fdleaky.fd_tracker import FdTracker
+from fdleaky.report import main as report_main
 
 
 def main():
     """Main entry point"""
+    # Reading keypresses consumes all input from the terminal, so it must be requested
+    keypress = len(sys.argv) > 1 and sys.argv[1] == "--keypress"
+    if keypress:
+        sys.argv = sys.argv[:1] + sys.argv[2:]
+
     if len(sys.argv) < 2:
-        print("Usage: python -m fdleaky module_to_run [args...]", file=sys.stderr)
+        print(
+            "Usage: python -m fdleaky [--keypress] module_to_run [args...]",
+            file=sys.stderr,
+        )
+        print("       python -m fdleaky report dir [options...]", file=sys.stderr)
         sys.exit(1)
 
+    if sys.argv[1] == "report":
+        report_main(sys.argv[2:])
+        return
+
     # Enable FD tracking
     fd_tracker = FdTracker()
     fd_tracker.start()
 
+    # Dump open file descriptors by call site on SIGUSR1, or when p is pressed in the terminal
+    install_signal_handler(fd_tracker)
+    if keypress:
+        start_keypress_listener(fd_tracker)
+
     # Get the module to run
     module_name = sys.argv[1]
 
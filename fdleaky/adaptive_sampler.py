@@ -0,0 +1,58 @@
+from dataclasses import dataclass, field
+from threading import Lock
+
+
+@dataclass(slots=True)
+class SiteSampleState:
+    """Counters for a single call site, which are updated holding its lock"""
+
+    open_count: int = 0
+    close_count: int = 0
+    peak_open: int = 0
+    interval: int = 1
+    countdown: int = 0
+    lock: Lock = field(default_factory=Lock, repr=False, compare=False)
+
+    @property
+    def num_open(self) -> int:
+        return self.open_count - self.close_count
+
+
+@dataclass
+class AdaptiveSampler:
+    """
+    Decides which opens should have a full stack captured. Every open and close is counted by
+    call site, but only 1 in every N opens at a site is captured. N starts at 1 for every site and
+    doubles (Up to max_interval) each time a stack is captured without the number of open file
+    descriptors for the site reaching a new peak. Any open which takes a site to a new peak resets
+    N to 1, so a site whose open count keeps rising is captured on every open.
+    """
+
+    max_interval: int = 64
+    sites: dict[int, SiteSampleState] = field(default_factory=dict)
+
+    def should_capture(self, site_id: int) -> bool:
+        state = self.sites.get(site_id)
+        if state is None:
+            # setdefault is atomic, so concurrent opens at a new site share one state
+            state = self.sites.setdefault(site_id, SiteSampleState())
+        with state.lock:
+            state.open_count += 1
+            num_open = state.open_count - state.close_count
+            if num_open > state.peak_open:
+                state.peak_open = num_open
+                state.interval = 1
+                state.countdown = 0
+                return True
+            if state.countdown:
+                state.countdown -= 1
+                return False
+            state.interval = min(state.interval * 2, self.max_interval)
+            state.countdown = state.interval - 1
+            return True
+
+    def on_close(self, site_id: int):
+        state = self.sites.get(site_id)
+        if state is not None:
+            with state.lock:
+                state.close_count += 1
@@ -0,0 +1,63 @@
+"""Triggers for dumping the file descriptors tracked by call site from a running process"""
+
+import atexit
+import os
+import signal
+import sys
+from threading import Thread
+from typing import TextIO
+
+from fdleaky.fd_tracker import FdTracker
+
+try:
+    import termios
+    import tty
+except ImportError:  # pragma: no cover - Not available on windows
+    termios = None
+
+
+def install_signal_handler(
+    fd_tracker: FdTracker, signum: int | None = getattr(signal, "SIGUSR1", None)
+) -> bool:
+    """
+    Request a dump each time the process receives the signal. (SIGUSR1 by default, where
+    available). This must be called from the main thread.
+    """
+    if signum is None:
+        return False
+    signal.signal(signum, lambda *_: fd_tracker.request_dump())
+    return True
+
+
+def start_keypress_listener(
+    fd_tracker: FdTracker, key: str = "p", stream: TextIO = sys.stdin
+) -> Thread | None:
+    """
+    Request a dump each time the key is pressed, if the stream is a terminal. The terminal is put
+    into cbreak mode (So keys are read without waiting for enter) until the process exits, and
+    other input from the stream is discarded - so this is unsuitable for programs which read from
+    the terminal themselves (e.g.: With input() or pdb).
+    """
+    if termios is None or not stream.isatty():
+        return None
+    fileno = stream.fileno()
+    attributes = termios.tcgetattr(fileno)
+    tty.setcbreak(fileno)
+    atexit.register(termios.tcsetattr, fileno, termios.TCSADRAIN, attributes)
+    thread = Thread(
+        target=_listen, args=(fd_tracker, fileno, key.encode()), daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def _listen(fd_tracker: FdTracker, fileno: int, key: bytes):
+    while True:
+        try:
+            data = os.read(fileno, 1)
+        except OSError:
+            return
+        if not data:
+            return  # End of input
+        if data == key:
+            fd_tracker.request_dump()
@@ -0,0 +1,67 @@
+from collections import deque
+from dataclasses import dataclass, field
+from itertools import count
+from threading import Lock
+import time
+from typing import Iterator
+
+from fdleaky.fd import Fd
+
+# Sequence number, key in the short term store, and either the Fd opened or the time of closing
+Event = tuple[int, int, Fd | None, float | None]
+
+
+@dataclass
+class EventRing:
+    """
+    Bounded ring of the opens and closes made by application threads, which the worker drains and
+    applies to the stores in batches. Appending is a single deque operation. Batches must be
+    drained and applied holding the lock, so that they are applied in order whichever thread
+    applies them - once the ring is full, the thread appending an event applies those queued
+    rather than let the oldest be discarded. (Events discarded by threads racing to fill the ring
+    are still counted in num_dropped)
+    """
+
+    size: int
+    lock: Lock = field(default_factory=Lock, repr=False)
+    max_seq: int = -1
+    num_drained: int = 0
+    _events: deque = field(default_factory=deque, repr=False)
+    _seq: Iterator[int] = field(default_factory=count, repr=False)
+
+    def __post_init__(self):
+        self._events = deque(self._events, maxlen=self.size)
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def is_full(self) -> bool:
+        return len(self._events) >= self.size
+
+    def is_half_full(self) -> bool:
+        return len(self._events) >= self.size // 2
+
+    def append_open(self, key: int, fd: Fd):
+        self._events.append((next(self._seq), key, fd, None))
+
+    def append_close(self, key: int):
+        self._events.append((next(self._seq), key, None, time.time()))
+
+    def drain(self) -> list[Event]:
+        """Remove all the events queued, oldest first. (The lock must be held)"""
+        events = self._events
+        batch = []
+        try:
+            while True:
+                batch.append(events.popleft())
+        except IndexError:
+            pass  # The ring is empty
+        if batch:
+            self.num_drained += len(batch)
+            self.max_seq = max(self.max_seq, max(event[0] for event in batch))
+        return batch
+
+    @property
+    def num_dropped(self) -> int:
+        """Number of events discarded because the ring was full when they were appended"""
+        return self.max_seq + 1 - self.num_drained
@@ -2,11 +2,18 @@ from dataclasses import dataclass, field
 import time
 from typing import Any
 
+from fdleaky.stack import stack_table
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, slots=True)
 class Fd:
     """File descriptor object created each time a file descriptor is opened."""
 
     subject: Any
-    stack: list[str]
+    stack_id: int
     created_at: float = field(default_factory=time.time)
+
+    @property
+    def stack(self) -> list[str]:
+        """Formatted stack from the point at which the file descriptor was opened"""
+        return stack_table.get_stack(self.stack_id)
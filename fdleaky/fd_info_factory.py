@@ -1,9 +1,12 @@
 from dataclasses import dataclass, field
 from datetime import datetime
+import re
 import time
 from fdleaky.fd import Fd
 from fdleaky.fd_info import FdInfo
 
+_MISSING = object()
+
 
 @dataclass
 class FdInfoFactory:
@@ -12,11 +15,20 @@ class FdInfoFactory:
     be transferred to long term storage. This is Useful for filtering out general cases we don't
     want to monitor, such as database connection pools and listen operations on server sockets.
 
+    The identifier for an Fd is the innermost frame of its stack containing any of the include
+    strings. Fds with any frame containing one of the exclude strings are never stored. Each list
+    is compiled into a single regular expression, and identifiers are memoized by stack.
+
     The default implementation stores any open file descriptor over 1 minute old.
     """
 
     min_age: int = 60
     identifier_include_any_of: list[str] = field(default_factory=lambda: [""])
+    identifier_exclude_any_of: list[str] = field(default_factory=list)
+    _identifiers: dict[int, str | None] = field(default_factory=dict, repr=False)
+    _patterns: tuple | None = field(default=None, repr=False)
+    _include: re.Pattern | None = field(default=None, repr=False)
+    _exclude: re.Pattern | None = field(default=None, repr=False)
 
     def create_fd_info(self, fd: Fd) -> FdInfo | None:
         time_alive = time.time() - fd.created_at
@@ -31,19 +43,50 @@ class FdInfoFactory:
             created_at=datetime.fromtimestamp(fd.created_at),
         )
 
+    def get_deadline(self, fd: Fd) -> float:
+        """
+        Get the time before which create_fd_info will not create an FdInfo for an Fd. Where a
+        subclass overrides create_fd_info and it returns None after the deadline, the tracker asks
+        again every sleep_interval seconds until the fd is closed.
+        """
+        return fd.created_at + self.min_age
+
     def get_identifier(self, fd: Fd) -> str | None:
-        return next(
-            (
-                frame
-                for frame in reversed(fd.stack)
-                if next(
-                    (
-                        True
-                        for include in self.identifier_include_any_of
-                        if include in frame
-                    ),
-                    False,
-                )
-            ),
-            None,
+        """
+        Get the innermost frame in the stack of an Fd containing any of the include strings, or
+        None if there is no such frame or any frame contains one of the exclude strings. Results
+        are memoized by stack id.
+        """
+        self._compile()
+        identifiers = self._identifiers
+        identifier = identifiers.get(fd.stack_id, _MISSING)
+        if identifier is _MISSING:
+            identifier = identifiers[fd.stack_id] = self._match(fd.stack)
+        return identifier
+
+    def _compile(self):
+        patterns = (
+            tuple(self.identifier_include_any_of),
+            tuple(self.identifier_exclude_any_of),
         )
+        if patterns != self._patterns:
+            self._include = _compile_any_of(patterns[0])
+            self._exclude = _compile_any_of(patterns[1])
+            self._identifiers = {}
+            self._patterns = patterns
+
+    def _match(self, stack: list[str]) -> str | None:
+        exclude = self._exclude
+        if exclude is not None and exclude.search("".join(stack)):
+            return None
+        include = self._include
+        if include is None:
+            return None
+        return next((frame for frame in reversed(stack) if include.search(frame)), None)
+
+
+def _compile_any_of(patterns: tuple[str, ...]) -> re.Pattern | None:
+    """Compile a regular expression matching any of the strings given"""
+    if not patterns:
+        return None
+    return re.compile("|".join(re.escape(pattern) for pattern in patterns))
@@ -11,3 +11,9 @@ class FdInfoStore(ABC):
     @abstractmethod
     def delete(self, stored_id: str) -> bool:
         """Load an FdInfo object from its id"""
+
+    def flush(self):
+        """Write any buffered changes. Called by the tracker each time its worker wakes"""
+
+    def close(self):
+        """Write any buffered changes and release any resources held by the store"""
@@ -1,16 +1,57 @@
 import builtins
+from collections import deque
+from collections.abc import MutableMapping
 from dataclasses import dataclass, field
+from datetime import datetime
+from heapq import heappop, heappush, nlargest
+import logging
+import math
+import os
+import select
+import selectors
 import socket
+import sys
 from tempfile import _io
-from threading import Thread
+from threading import Condition, Thread
 import time
 import traceback as tb
-from typing import Callable
+from typing import Any, Callable, TextIO
+from weakref import finalize
 
-from fdleaky.dir_fd_info_store import DirFdInfoStore
+from fdleaky.adaptive_sampler import AdaptiveSampler
+from fdleaky.event_ring import Event, EventRing
 from fdleaky.fd import Fd
+from fdleaky.fd_info import FdInfo
 from fdleaky.fd_info_factory import FdInfoFactory
 from fdleaky.fd_info_store import FdInfoStore
+from fdleaky.headroom_monitor import HeadroomMonitor
+from fdleaky.open_classifier import OpenClassifier
+from fdleaky.proc_fd_scanner import ProcFdScanner, get_fileno
+from fdleaky.sharded_dict import ShardedDict
+from fdleaky.site_stats import SiteStatsCollector
+from fdleaky.snapshot import Snapshot
+from fdleaky.stack import (
+    capture_stack_id,
+    get_call_module,
+    is_in_scope,
+    get_call_site,
+    stack_table,
+)
+from fdleaky.trend_detector import TrendDetector
+from fdleaky.weak_fd_store import WeakFdStore
+from fdleaky.write_behind_fd_info_store import WriteBehindFdInfoStore
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _new_state_mapping() -> MutableMapping:
+    """
+    Create a mapping for tracker state modified by many threads. Sharding only pays for its
+    locks where threads run in parallel - with the GIL, each dict operation is already atomic.
+    """
+    if getattr(sys, "_is_gil_enabled", lambda: True)():
+        return {}
+    return ShardedDict()
 
 
 # pylint: disable=R0902, W0622
@@ -20,19 +61,155 @@ class FdTracker:
     Tracker for leaking file descriptors. Patches built in function storing a stack trace for when
     they are File Descriptors are Opened in a local dictionary. A file descriptor may be copied to
     long term storage, if the associated factory can create an info object for it.
+
+    Stacks are interned in the stack table, so each Fd only holds a small integer stack id. When
+    lazy_stack is set (The default), only the code object and line number of each frame is
+    captured when a file descriptor is opened, and the stack is formatted only if it is actually
+    needed. (Most file descriptors are closed long before this happens)
+
+    If a sampler is given, every open and close is still counted, but a full stack is only captured
+    for the opens it selects - other file descriptors only record their call site.
+
+    If site_stats is given, opens and closes are counted by call site along with a histogram of
+    the lifetime of file descriptors, which distinguishes a leaking site (Whose number of open
+    file descriptors keeps growing) from one which is merely slow, without relying on min_age.
+
+    If a trend_detector is given (Which also requires site_stats, created if not given), the
+    number of open file descriptors for each call site is sampled every sleep_interval seconds,
+    and sites where this grows steadily are logged and written to long term storage (Until they
+    stop growing), however old their individual file descriptors are. This may be combined with
+    a large min_age, so that healthy long lived file descriptors are not reported.
+
+    If a headroom_monitor is given, the number of open file descriptors is compared with the
+    soft RLIMIT_NOFILE limit. Opening a file descriptor only compares the number tracked with a
+    precomputed threshold, and the worker is woken when the next watermark is reached. It then
+    counts the file descriptors actually open (Also every sleep_interval seconds), and on crossing
+    a watermark logs a warning and writes a report of the top_n call sites by number open to long
+    term storage - which takes time linear in the number tracked, and so is bounded by the limit.
+    Reports are deleted when the number open falls back below their watermark.
+
+    request_dump may be called at any time (Including from a signal handler) to have the worker
+    write the number of file descriptors tracked by call site, with the age of the oldest, to
+    dump_file (sys.stderr by default). This reads only the stack id and open time of each entry in
+    a copy of the short term store, so application threads are not stopped while it is produced.
+
+    snapshot returns an immutable Snapshot of the number of file descriptors open at each call
+    site, which may be compared with an earlier snapshot to find the sites which grew. This
+    requires site_stats (Whose counters it reads without taking any lock, so opens and closes on
+    other threads are never blocked), rather than copying the short term store.
+
+    If a classifier is given, it is consulted before anything else each time a file descriptor is
+    opened. File descriptors it expects to be long lived are only counted by the classifier, and
+    are neither captured nor tracked.
+
+    If include_packages or include_path_prefixes are given, only file descriptors opened with a
+    frame from one of the packages, or with a filename starting with one of the prefixes, within
+    the innermost max_scope_depth frames are tracked. This is checked before any stack is
+    captured. When trim_stacks is set, frames for fdleaky and for the standard library outside the
+    innermost application frame (e.g.: The asyncio event loop) are removed from captured stacks.
+
+    If max_entries is given, file descriptors opened while the short term store holds this many
+    are tracked in degraded mode: only their call site and the time they were opened are kept
+    (The full stack is not even captured, and the subject is not kept), so that neither the memory
+    used by the tracker nor the cost of each open grows with the leak it is diagnosing. A warning
+    is logged on entering degraded mode, and counts by call site are written to long term storage
+    once the oldest is older than the min_age of the factory. The short term store regains full
+    entries as they are closed.
+
+    File descriptors are queued for promotion by the time at which the factory may first create an
+    info object for them, so each iteration of the worker only examines those which are due.
+    Opens are appended to a deque which the worker drains into the queue, so opens on different
+    threads do not contend for a lock. Closed file descriptors are discarded from the queue lazily.
+    The worker sleeps until the next deadline (Or indefinitely if nothing is queued) and is woken
+    by an open with an earlier deadline, or immediately when the tracker is closed.
+
+    The long term store is flushed each time the worker wakes, and the worker is woken when a
+    file descriptor in long term storage is closed. The default long term store queues changes in
+    memory until flushed, so closing a file descriptor never does I/O on the application thread.
+
+    If an event_ring_size is given, opening or closing a file descriptor only appends an event to
+    a bounded ring (After capturing the stack), and the worker applies the events to the stores
+    every event_ring_interval seconds, so all other bookkeeping happens on the worker thread. The
+    worker is woken early once the ring is half full, and if the ring is full the thread adding an
+    event applies those queued itself, so no close is lost. (Events discarded by threads racing
+    to fill the ring are counted in num_dropped_events)
+
+    The short term store may be any mutable mapping - a WeakFdStore does not keep subjects
+    alive (Garbage collected subjects are detected lazily, as with use_finalizers), and a
+    ShardedDict reduces contention between threads opening and closing file descriptors
+    concurrently. (The mapping of promoted file descriptors is sharded on free threaded builds
+    of python). The worker iterates over a snapshot of each mapping, taken using
+    its snapshot method if present.
+
+    When use_finalizers is set, file objects are not given a patched close method. Instead, a
+    finalizer removes each file descriptor when its subject is garbage collected (A dict or
+    ShardedDict short term store would keep subjects alive, so is replaced with a WeakFdStore when
+    the tracker is started), and the closed state of subjects is checked before promotion and
+    every sleep_interval seconds for promoted subjects.
+    This also catches files closed through detach() or by garbage collection.
+
+    When track_os_fds is set, integer file descriptors created by os.open, os.pipe, os.dup and
+    os.dup2 are also tracked (Until they are passed to os.close / os.closerange, or ownership is
+    passed to a file or socket object created from them - as subprocess does with pipes), along
+    with epoll objects. (select.epoll is replaced with a function while the tracker is open, and
+    closed epoll objects are detected lazily, as with use_finalizers)
+
+    If a proc_fd_scanner is given, the worker compares the file descriptors listed in /proc/self/fd
+    with those tracked every sleep_interval seconds. Tracked file descriptors which are no longer
+    open are discarded, and untracked file descriptors (e.g.: Those opened by C extensions) which
+    have been open for longer than the min_age of the factory are written to long term storage.
+    (File descriptors open when the tracker starts, skipped by the classifier or scope, or tracked
+    in degraded mode are known, so are ignored by the scanner)
     """
 
     fd_info_factory: FdInfoFactory = field(default_factory=FdInfoFactory)
-    long_term_store: FdInfoStore = field(default_factory=DirFdInfoStore)
-    short_term_store: dict[int, Fd] = field(default_factory=dict)
+    long_term_store: FdInfoStore = field(default_factory=WriteBehindFdInfoStore)
+    short_term_store: MutableMapping[int, Fd] = field(
+        default_factory=_new_state_mapping
+    )
     sleep_interval: int = 5
+    lazy_stack: bool = True
+    sampler: AdaptiveSampler | None = None
+    site_stats: SiteStatsCollector | None = None
+    trend_detector: TrendDetector | None = None
+    headroom_monitor: HeadroomMonitor | None = None
+    dump_file: TextIO | None = None
+    classifier: OpenClassifier | None = None
+    include_packages: list[str] = field(default_factory=list)
+    include_path_prefixes: list[str] = field(default_factory=list)
+    max_scope_depth: int = 64
+    trim_stacks: bool = False
+    max_entries: int | None = None
+    use_finalizers: bool = False
+    track_os_fds: bool = False
+    proc_fd_scanner: ProcFdScanner | None = None
+    event_ring_size: int | None = None
+    event_ring_interval: float = 0.1
     is_open: bool = False
-    _id_mapping: dict[int, str] = field(default_factory=dict)
+    _id_mapping: MutableMapping[int, str] = field(default_factory=_new_state_mapping)
+    _promotion_queue: list[tuple[float, int]] = field(default_factory=list)
+    _new_promotions: deque = field(default_factory=deque)
+    _wait_deadline: float = -math.inf
+    _condition: Condition = field(default_factory=Condition)
+    _next_periodic: float = 0
+    _untracked_mapping: dict[tuple[int, float], str] = field(default_factory=dict)
+    _degraded: dict[int, tuple[int, float]] = field(default_factory=dict)
+    _degraded_mapping: dict[int, tuple[int, str]] = field(default_factory=dict)
+    _degraded_reported: bool = False
+    _trend_mapping: dict[int, str] = field(default_factory=dict)
+    _headroom_threshold: float = math.inf
+    _headroom_due: bool = False
+    _headroom_mapping: dict[int, str] = field(default_factory=dict)
+    _dump_requested: bool = False
+    _scope: tuple[dict, tuple[str, ...], tuple[str, ...]] | None = None
+    _events: EventRing | None = None
     _original_open: Callable | None = None
     _original_io_open: Callable | None = None
     _original_init: Callable | None = None
     _original_close: Callable | None = None
     _original_detach: Callable | None = None
+    _original_os_functions: dict[str, Callable] = field(default_factory=dict)
+    _original_epoll: type | None = None
     _worker: Thread = None
 
     def __enter__(self):
@@ -46,6 +223,7 @@ class FdTracker:
     def start(self):
         if self.is_open:
             return
+        self._prepare_state()
         self._original_open = builtins.open
         self._original_io_open = _io.open
         self._original_init = socket.socket.__init__
@@ -72,23 +250,168 @@ class FdTracker:
         socket.socket.__init__ = _patched_init
         socket.socket.close = _patched_close
         socket.socket.detach = _patched_detach
+        if self.track_os_fds:
+            self._patch_os_fds()
         self._worker = Thread(target=self._do_long_term_store, daemon=True)
         self.is_open = True
         self._worker.start()
 
+    def _prepare_state(self):
+        """Resolve the optional components configured, before anything is patched"""
+        if self.proc_fd_scanner is not None:
+            if self.proc_fd_scanner.is_available():
+                self.proc_fd_scanner.ignore_open()
+            else:
+                self.proc_fd_scanner = None
+        if self.use_finalizers and isinstance(
+            self.short_term_store, (dict, ShardedDict)
+        ):
+            weak_store = WeakFdStore()
+            weak_store.update(self.short_term_store)
+            self.short_term_store = weak_store
+        if self.trend_detector is not None and self.site_stats is None:
+            self.site_stats = SiteStatsCollector()
+        if self.headroom_monitor is not None:
+            if self.headroom_monitor.read_limit() is None:
+                self.headroom_monitor = None
+            else:
+                self._headroom_due = True
+        if self.include_packages or self.include_path_prefixes:
+            self._scope = (
+                {},
+                tuple(f"{package}." for package in self.include_packages),
+                tuple(self.include_path_prefixes),
+            )
+        if self.event_ring_size:
+            self._events = EventRing(self.event_ring_size)
+
     def close(self):
         if not self.is_open:
             return
         builtins.open = self._original_open  # pylint: disable=W0622
+        _io.open = self._original_io_open
         socket.socket.__init__ = self._original_init
         socket.socket.close = self._original_close
         socket.socket.detach = self._original_detach
-        self.is_open = False
+        if self.track_os_fds:
+            self._unpatch_os_fds()
+        with self._condition:
+            self.is_open = False
+            self._condition.notify_all()
         self._worker.join()
 
+    def _patch_os_fds(self):
+        originals = self._original_os_functions
+        for name in ("open", "pipe", "dup", "dup2", "close", "closerange"):
+            originals[name] = getattr(os, name)
+
+        def _patched_os_open(*args, **kwargs):
+            return self._patched_os_open(*args, **kwargs)
+
+        def _patched_os_pipe():
+            return self._patched_os_pipe()
+
+        def _patched_os_dup(*args, **kwargs):
+            return self._patched_os_dup(*args, **kwargs)
+
+        def _patched_os_dup2(*args, **kwargs):
+            return self._patched_os_dup2(*args, **kwargs)
+
+        def _patched_os_close(*args, **kwargs):
+            return self._patched_os_close(*args, **kwargs)
+
+        def _patched_os_closerange(*args, **kwargs):
+            return self._patched_os_closerange(*args, **kwargs)
+
+        os.open = _patched_os_open
+        os.pipe = _patched_os_pipe
+        os.dup = _patched_os_dup
+        os.dup2 = _patched_os_dup2
+        os.close = _patched_os_close
+        os.closerange = _patched_os_closerange
+
+        original_epoll = getattr(select, "epoll", None)
+        if original_epoll is not None:
+            self._original_epoll = original_epoll
+
+            def _patched_epoll(*args, **kwargs):
+                return self._patched_epoll(*args, **kwargs)
+
+            select.epoll = _patched_epoll
+            # pylint: disable-next=W0212
+            selectors.EpollSelector._selector_cls = staticmethod(_patched_epoll)
+
+    def _unpatch_os_fds(self):
+        for name, function in self._original_os_functions.items():
+            setattr(os, name, function)
+        if self._original_epoll is not None:
+            select.epoll = self._original_epoll
+            # pylint: disable-next=W0212
+            selectors.EpollSelector._selector_cls = self._original_epoll
+
+    def _patched_epoll(self, *args, **kwargs):
+        # epoll objects can neither be subclassed nor given a patched close method, so closes are
+        # detected lazily using their closed attribute
+        epoll = self._original_epoll(*args, **kwargs)
+        self._create_fd(epoll)
+        return epoll
+
+    def _patched_os_open(self, *args, **kwargs):
+        fd = self._original_os_functions["open"](*args, **kwargs)
+        self._create_fd(fd, _raw_fd_key(fd))
+        return fd
+
+    def _patched_os_pipe(self):
+        fds = self._original_os_functions["pipe"]()
+        for fd in fds:
+            self._create_fd(fd, _raw_fd_key(fd))
+        return fds
+
+    def _patched_os_dup(self, *args, **kwargs):
+        fd = self._original_os_functions["dup"](*args, **kwargs)
+        self._create_fd(fd, _raw_fd_key(fd))
+        return fd
+
+    def _patched_os_dup2(self, *args, **kwargs):
+        fd = self._original_os_functions["dup2"](*args, **kwargs)
+        # The target descriptor is silently closed if it was open
+        key = _raw_fd_key(fd)
+        self._close_fd(key)
+        self._create_fd(fd, key)
+        return fd
+
+    def _patched_os_close(self, *args, **kwargs):
+        result = self._original_os_functions["close"](*args, **kwargs)
+        self._close_fd(_raw_fd_key(_get_subject(args, kwargs, "fd")))
+        return result
+
+    def _patched_os_closerange(self, fd_low: int, fd_high: int):
+        result = self._original_os_functions["closerange"](fd_low, fd_high)
+        if fd_high - fd_low <= len(self.short_term_store):
+            keys = [_raw_fd_key(fd) for fd in range(fd_low, fd_high)]
+        else:
+            low_key = _raw_fd_key(fd_high)
+            high_key = _raw_fd_key(fd_low)
+            keys = [
+                k for k in _snapshot(self.short_term_store) if low_key < k <= high_key
+            ]
+        for key in keys:
+            self._close_fd(key)
+        return result
+
+    def _transfer_raw_fd(self, fd: Any, open_args=(), open_kwargs=None):
+        """Stop tracking a raw file descriptor if a file or socket object now owns it"""
+        if self.track_os_fds and isinstance(fd, int):
+            closefd = _get_arg(open_args, open_kwargs or {}, 6, "closefd")
+            if closefd is None or closefd:
+                self._close_fd(_raw_fd_key(fd))
+
     def _patched_open(self, *args, **kwargs):
         file_obj = self._original_open(*args, **kwargs)
+        self._transfer_raw_fd(_get_arg(args, kwargs, 0, "file"), args, kwargs)
         fd = self._create_fd(file_obj)
+        if self.use_finalizers:
+            return file_obj
         file_close = file_obj.close
 
         def patched_file_close(*args, **kwargs):
@@ -101,7 +424,10 @@ class FdTracker:
 
     def _patched_io_open(self, *args, **kwargs):
         file_obj = self._original_io_open(*args, **kwargs)
+        self._transfer_raw_fd(_get_arg(args, kwargs, 0, "file"), args, kwargs)
         fd = self._create_fd(file_obj)
+        if self.use_finalizers:
+            return file_obj
         file_close = file_obj.close
 
         def patched_io_close(*args, **kwargs):
@@ -115,6 +441,7 @@ class FdTracker:
     def _patched_init(self, *args, **kwargs):
         result = self._original_init(*args, **kwargs)
         subject = _get_subject(args, kwargs)
+        self._transfer_raw_fd(_get_arg(args, kwargs, 4, "fileno"))
         self._create_fd(subject)
         return result
 
@@ -132,34 +459,535 @@ class FdTracker:
         self._close_fd(id_)
         return result
 
-    def _create_fd(self, file_obj) -> int:
-        fd = Fd(file_obj, tb.format_stack())
-        id_ = id(file_obj)
-        self.short_term_store[id_] = fd
+    def _create_fd(self, file_obj, id_: int | None = None) -> int:
+        classifier = self.classifier
+        scope = self._scope
+        if (
+            classifier is not None
+            and classifier.is_expected(file_obj, get_call_module())
+        ) or (scope is not None and not is_in_scope(*scope, self.max_scope_depth)):
+            if self.proc_fd_scanner is not None:
+                self.proc_fd_scanner.ignore(
+                    file_obj
+                )  # Not tracked, but not unknown either
+            return id(file_obj) if id_ is None else id_
+        sampler = self.sampler
+        site_id = None
+        if sampler is not None:
+            site_id = stack_table.intern((get_call_site(),))
+            if not sampler.should_capture(site_id):
+                return self._store_fd(Fd(file_obj, site_id), id_)
+        max_entries = self.max_entries
+        if max_entries is not None and len(self.short_term_store) >= max_entries:
+            # Degraded file descriptors only keep their site, so the full stack is not captured
+            if site_id is None:
+                site_id = stack_table.intern((get_call_site(),))
+            return self._store_fd(Fd(file_obj, site_id), id_)
+        if self.lazy_stack:
+            stack_id = capture_stack_id()
+        else:
+            stack_id = stack_table.intern(tuple(tb.format_stack()), site_id)
+        if self.trim_stacks:
+            stack_id = stack_table.get_trimmed_id(stack_id)
+        return self._store_fd(Fd(file_obj, stack_id), id_)
+
+    def _store_fd(self, fd: Fd, id_: int | None = None) -> int:
+        if id_ is None:
+            id_ = id(fd.subject)
+        events = self._events
+        if events is None:
+            self._add_fd(fd, id_)
+        else:
+            self._make_room_for_event(events)
+            events.append_open(id_, fd)
         return id_
 
     def _close_fd(self, id_: int):
-        self.short_term_store.pop(id_, None)
+        events = self._events
+        if events is None:
+            self._remove_fd(id_)
+        else:
+            self._make_room_for_event(events)
+            events.append_close(id_)
+
+    def _make_room_for_event(self, events: EventRing):
+        if events.is_full():
+            self._apply_events()  # Rather than let the oldest event be discarded
+        elif events.is_half_full() and self._wait_deadline != -math.inf:
+            with self._condition:
+                self._condition.notify()  # The worker is waiting, but the ring is filling
+
+    def _add_fd(self, fd: Fd, id_: int):
+        store = self.short_term_store
+        if self.site_stats is not None:
+            self.site_stats.on_open(stack_table.get_site_id(fd.stack_id))
+        if self.use_finalizers:
+            try:
+                finalize(fd.subject, self._close_fd, id_).atexit = False
+            except TypeError:
+                pass  # The subject does not support weak references
+        # An entry for the same id is for a subject collected without being closed
+        degraded = self._degraded
+        previous = store.get(id_)
+        if previous is not None:
+            self._on_site_closed(
+                stack_table.get_site_id(previous.stack_id), previous.created_at, None
+            )
+        elif degraded:
+            site = degraded.pop(id_, None)
+            if site is not None:
+                self._on_site_closed(*site, None)
+        # Including the file descriptor being added
+        if len(store) + len(degraded) + 1 >= self._headroom_threshold:
+            self._headroom_threshold = math.inf  # Until the worker has checked
+            with self._condition:
+                self._headroom_due = True
+                self._condition.notify()
+        max_entries = self.max_entries
+        if max_entries is not None and previous is None and len(store) >= max_entries:
+            if not degraded:
+                with self._condition:
+                    self._condition.notify()  # Report degraded mode from the worker
+            degraded[id_] = (stack_table.get_site_id(fd.stack_id), fd.created_at)
+            if self.proc_fd_scanner is not None:
+                self.proc_fd_scanner.ignore(
+                    fd.subject
+                )  # Degraded entries keep no subject
+            return
+        store[id_] = fd
+        deadline = self.fd_info_factory.get_deadline(fd)
+        self._new_promotions.append((deadline, id_))
+        if deadline < self._wait_deadline:
+            # The worker is waiting for a later deadline (or no deadline at all)
+            with self._condition:
+                self._condition.notify()
+
+    def _remove_fd(self, id_: int, closed_at: float | None = None):
+        fd = self.short_term_store.pop(id_, None)
+        if fd is not None:
+            self._on_site_closed(
+                stack_table.get_site_id(fd.stack_id), fd.created_at, closed_at
+            )
+        elif self._degraded:
+            site = self._degraded.pop(id_, None)
+            if site is not None:
+                self._on_site_closed(*site, closed_at)
         stored_id = self._id_mapping.pop(id_, None)
         if stored_id:
             self.long_term_store.delete(stored_id)
+            # Wake the worker so the delete is flushed promptly
+            with self._condition:
+                self._condition.notify()
+
+    def _on_site_closed(self, site_id: int, created_at: float, closed_at: float | None):
+        if self.sampler is not None:
+            self.sampler.on_close(site_id)
+        if self.site_stats is not None:
+            if closed_at is None:
+                closed_at = time.time()
+            self.site_stats.on_close(site_id, closed_at - created_at)
+
+    @property
+    def num_dropped_events(self) -> int:
+        """Number of events discarded because the event ring was full when they were added"""
+        return 0 if self._events is None else self._events.num_dropped
+
+    def _apply_events(self):
+        with self._events.lock:
+            self._apply_event_batch(self._events.drain())
+
+    def _apply_event_batch(self, batch: list[Event]):
+        # A file descriptor opened and closed within the batch never reaches the stores
+        opened = {}
+        for index, (_, id_, fd, closed_at) in enumerate(batch):
+            open_index = opened.pop(id_, None)
+            if open_index is not None:
+                # The earlier open is either closed or replaced within the batch, and itself
+                # replaced any entry for the same id from an earlier batch
+                opened_fd = batch[open_index][2]
+                batch[open_index] = None
+                self._remove_fd(id_, opened_fd.created_at)
+                site_id = stack_table.get_site_id(opened_fd.stack_id)
+                if self.site_stats is not None:
+                    self.site_stats.on_open(site_id)
+                self._on_site_closed(site_id, opened_fd.created_at, closed_at)
+                if fd is None:
+                    batch[index] = None
+                    continue
+            if fd is not None:
+                opened[id_] = index
+        for event in batch:
+            if event is not None:
+                _, id_, fd, closed_at = event
+                if fd is None:
+                    self._remove_fd(id_, closed_at)
+                else:
+                    self._add_fd(fd, id_)
 
-    def _process_fd_for_long_term(self, fd: Fd):
-        id_ = id(fd.subject)
-        if id_ not in self._id_mapping:
-            fd_info = self.fd_info_factory.create_fd_info(fd)
-            if fd_info:
+    def _process_fd_for_long_term(self, fd: Fd, id_: int | None = None) -> bool:
+        """Store an FdInfo for an fd if the factory creates one, returning whether one is stored"""
+        if id_ is None:
+            id_ = id(fd.subject)
+        if id_ in self._id_mapping:
+            return True
+        fd_info = self.fd_info_factory.create_fd_info(fd)
+        if not fd_info:
+            return False
+        self.long_term_store.create(fd_info)
+        self._id_mapping[id_] = fd_info.id
+        return True
+
+    def _drain_promotions(self):
+        """Move file descriptors queued by application threads into the queue of the worker"""
+        new_promotions = self._new_promotions
+        queue = self._promotion_queue
+        try:
+            while True:
+                heappush(queue, new_promotions.popleft())
+        except IndexError:
+            pass  # Drained
+
+    def _promote_due(self, now: float):
+        self._drain_promotions()
+        queue = self._promotion_queue
+        due = []
+        while queue and queue[0][0] <= now:
+            due.append(heappop(queue)[1])
+        for id_ in due:
+            fd = self.short_term_store.get(id_)
+            # The fd may have been closed, or its id reused by a newer fd with a later deadline
+            if fd is None or self.fd_info_factory.get_deadline(fd) > now:
+                continue
+            if self._lazy_close_detection and _is_closed(fd.subject):
+                self._remove_fd(id_)
+            elif not self._process_fd_for_long_term(fd, id_) and (
+                getattr(type(self.fd_info_factory), "create_fd_info", None)
+                is not FdInfoFactory.create_fd_info
+            ):
+                # A custom factory may have rules beyond the deadline, so is asked again later
+                heappush(queue, (now + self.sleep_interval, id_))
+
+    @property
+    def _lazy_close_detection(self) -> bool:
+        """Determine whether some subjects may be closed without the tracker being notified"""
+        return (
+            self.use_finalizers
+            or self.track_os_fds
+            or isinstance(self.short_term_store, WeakFdStore)
+        )
+
+    def _sweep_closed(self):
+        for id_ in _snapshot(self._id_mapping):
+            fd = self.short_term_store.get(id_)
+            if fd is None or _is_closed(fd.subject):
+                self._remove_fd(id_)
+
+    def _get_tracked_fds(self) -> dict[int, int]:
+        """Get the key in the short term store for each tracked file descriptor number"""
+        tracked_fds = {-1 - key: key for key in list(self._degraded) if key < 0}
+        for key, fd in _snapshot(self.short_term_store).items():
+            fileno = -1 - key if key < 0 else get_fileno(fd.subject)
+            if fileno is not None:
+                tracked_fds[fileno] = key
+        return tracked_fds
+
+    def _scan_proc_fds(self):
+        tracked_fds = self._get_tracked_fds()
+        scan = self.proc_fd_scanner.scan(set(tracked_fds))
+        for fileno in scan.stale:
+            self._remove_fd(tracked_fds[fileno])
+        untracked_mapping = self._untracked_mapping
+        min_first_seen = time.time() - self.fd_info_factory.min_age
+        current = {}
+        for proc_fd in scan.untracked:
+            key = (proc_fd.fd, proc_fd.first_seen)
+            stored_id = untracked_mapping.pop(key, None)
+            if stored_id is None and proc_fd.first_seen <= min_first_seen:
+                fd_info = FdInfo(
+                    identifier=f"Untracked file descriptor {proc_fd.fd}: {proc_fd.target}",
+                    stack=[],
+                    created_at=datetime.fromtimestamp(proc_fd.first_seen),
+                )
                 self.long_term_store.create(fd_info)
-                self._id_mapping[id_] = fd_info.id
+                stored_id = fd_info.id
+            if stored_id is not None:
+                current[key] = stored_id
+        # Anything left was closed or has become tracked since the last scan
+        for stored_id in untracked_mapping.values():
+            self.long_term_store.delete(stored_id)
+        self._untracked_mapping = current
+
+    @property
+    def is_degraded(self) -> bool:
+        """Determine whether file descriptors are being tracked without stacks or subjects"""
+        return bool(self._degraded)
+
+    def get_degraded_sites(self) -> dict[int, tuple[int, float]]:
+        """
+        Get the number of file descriptors tracked without stacks, and the time the oldest of them
+        was opened, keyed on the stack id of their call site.
+        """
+        sites = {}
+        for site_id, created_at in _snapshot(self._degraded).values():
+            num_fds, oldest = sites.get(site_id, (0, created_at))
+            sites[site_id] = (num_fds + 1, min(oldest, created_at))
+        return sites
+
+    def get_open_sites(self) -> dict[int, tuple[int, float]]:
+        """
+        Get the number of file descriptors tracked, and the time the oldest of them was opened,
+        keyed on the stack id of their call site. Subjects are not examined.
+        """
+        sites = self.get_degraded_sites()
+        for fd in _snapshot(self.short_term_store).values():
+            site_id = stack_table.get_site_id(fd.stack_id)
+            num_fds, oldest = sites.get(site_id, (0, fd.created_at))
+            sites[site_id] = (num_fds + 1, min(oldest, fd.created_at))
+        return sites
+
+    def snapshot(self) -> Snapshot:
+        """Take a snapshot of the number of file descriptors open at each call site"""
+        site_stats = self.site_stats
+        if site_stats is None:
+            raise ValueError("snapshot requires site_stats to be collected")
+        taken_at = time.time()
+        sites = {}
+        for site_id, stats in list(site_stats.sites.items()):
+            num_open = stats.num_open
+            if num_open > 0:
+                sites[site_id] = num_open
+        return Snapshot(sites, taken_at)
+
+    def request_dump(self):
+        """Request that the worker write the file descriptors tracked by call site to dump_file"""
+        with self._condition:
+            self._dump_requested = True
+            self._condition.notify()
+
+    def _dump_open_sites(self):
+        self._dump_requested = False
+        now = time.time()
+        sites = self.get_open_sites()
+        num_fds = sum(num_fds for num_fds, _ in sites.values())
+        lines = [f"fdleaky: {num_fds} file descriptors open at {len(sites)} call sites"]
+        for site_id, (num_fds, oldest) in sorted(
+            sites.items(), key=lambda item: (-item[1][0], item[1][1])
+        ):
+            site = stack_table.get_stack(site_id)[0].strip()
+            lines.append(f"  {num_fds} open (Oldest {now - oldest:.1f}s) at: {site}")
+        print("\n".join(lines), file=self.dump_file or sys.stderr, flush=True)
+
+    def _report_degraded(self):
+        if self._degraded and not self._degraded_reported:
+            _LOGGER.warning(
+                "fdleaky is tracking more than %s file descriptors - stacks are no longer "
+                "captured for new file descriptors, only counts by call site",
+                self.max_entries,
+            )
+        elif self._degraded_reported and not self._degraded:
+            _LOGGER.info("fdleaky is no longer over max_entries")
+        self._degraded_reported = bool(self._degraded)
+        min_first_seen = time.time() - self.fd_info_factory.min_age
+        degraded_mapping = self._degraded_mapping
+        current = {}
+        for site_id, (num_fds, oldest) in self.get_degraded_sites().items():
+            if oldest > min_first_seen:
+                continue
+            previous = degraded_mapping.pop(site_id, None)
+            if previous is not None and previous[0] == num_fds:
+                current[site_id] = previous
+                continue
+            if previous is not None:
+                self.long_term_store.delete(previous[1])
+            stack = stack_table.get_stack(site_id)
+            site = stack[0].strip()
+            fd_info = FdInfo(
+                identifier=f"{num_fds} file descriptors without stacks opened at: {site}",
+                stack=stack,
+                created_at=datetime.fromtimestamp(oldest),
+            )
+            self.long_term_store.create(fd_info)
+            current[site_id] = (num_fds, fd_info.id)
+        # Anything left has no degraded file descriptors older than min_age
+        for _, stored_id in degraded_mapping.values():
+            self.long_term_store.delete(stored_id)
+        self._degraded_mapping = current
+
+    @property
+    def _has_periodic_tasks(self) -> bool:
+        return bool(
+            (self._lazy_close_detection and self._id_mapping)
+            or self.proc_fd_scanner is not None
+            or self._degraded
+            or self._degraded_reported
+            or self.trend_detector is not None
+            or self.headroom_monitor is not None
+        )
+
+    def _do_periodic_tasks(self):
+        if self._lazy_close_detection:
+            self._sweep_closed()
+        if self.proc_fd_scanner is not None:
+            self._scan_proc_fds()
+        if self._degraded or self._degraded_reported:
+            self._report_degraded()
+        if self.trend_detector is not None:
+            self._report_trends()
+        if self.headroom_monitor is not None:
+            self._check_headroom()
+
+    def _report_trends(self):
+        now = time.time()
+        growing = self.trend_detector.sample(self.site_stats.sites, now)
+        trend_mapping = self._trend_mapping
+        for site_id in growing:
+            if site_id in trend_mapping:
+                continue
+            stack = stack_table.get_stack(site_id)
+            site = stack[0].strip()
+            trend = self.trend_detector.trends[site_id]
+            _LOGGER.warning(
+                "Open file descriptors growing by %.2f per minute (%s open) at: %s",
+                trend.slope * 60,
+                trend.num_open,
+                site,
+            )
+            fd_info = FdInfo(
+                identifier=f"Open file descriptors growing at: {site}",
+                stack=stack,
+                created_at=datetime.fromtimestamp(now),
+            )
+            self.long_term_store.create(fd_info)
+            trend_mapping[site_id] = fd_info.id
+        for site_id in list(trend_mapping):
+            if site_id not in growing:
+                self.long_term_store.delete(trend_mapping.pop(site_id))
+
+    def _check_headroom(self):
+        self._headroom_due = False
+        monitor = self.headroom_monitor
+        num_open = monitor.count(
+            lambda: len(self.short_term_store) + len(self._degraded)
+        )
+        level = monitor.get_level(num_open)
+        headroom_mapping = self._headroom_mapping
+        if level > monitor.level:
+            watermark = monitor.get_watermark(level)
+            _LOGGER.warning(
+                "%s of %s file descriptors are open (Over %.0f%% of RLIMIT_NOFILE)",
+                num_open,
+                monitor.limit,
+                watermark * 100,
+            )
+            fd_info = FdInfo(
+                identifier=f"{num_open} of {monitor.limit} file descriptors open "
+                f"(Over {watermark:.0%} of RLIMIT_NOFILE)",
+                stack=self._get_top_sites(monitor.top_n, monitor.num_untracked),
+                created_at=datetime.now(),
+            )
+            self.long_term_store.create(fd_info)
+            headroom_mapping[level] = fd_info.id
+        for report_level in [key for key in headroom_mapping if key > level]:
+            self.long_term_store.delete(headroom_mapping.pop(report_level))
+        monitor.level = level
+        self._headroom_threshold = monitor.get_threshold()
+
+    def _get_top_sites(self, top_n: int, num_untracked: int) -> list[str]:
+        """Get a line for each of the top_n call sites by number of file descriptors tracked"""
+        sites = self.get_open_sites()
+        lines = [
+            f"{num_fds} open at: {stack_table.get_stack(site_id)[0].strip()}"
+            for site_id, (num_fds, _) in nlargest(
+                top_n, sites.items(), key=lambda item: item[1][0]
+            )
+        ]
+        if num_untracked:
+            lines.append(f"{num_untracked} open without being tracked")
+        return lines
+
+    def _get_wait_timeout(self) -> float | None:
+        self._drain_promotions()
+        timeout = None if self._events is None else self.event_ring_interval
+        if self._promotion_queue:
+            queue_timeout = self._promotion_queue[0][0] - time.time()
+            if timeout is None or timeout > queue_timeout:
+                timeout = queue_timeout
+        if self._has_periodic_tasks:
+            periodic_timeout = self._next_periodic - time.time()
+            if timeout is None or timeout > periodic_timeout:
+                timeout = periodic_timeout
+        return timeout
 
     def _do_long_term_store(self):
+        condition = self._condition
         while self.is_open:
-            for fd in list(self.short_term_store.values()):
-                self._process_fd_for_long_term(fd)
-            time.sleep(self.sleep_interval)
+            # Opens need not notify the worker while it is awake
+            self._wait_deadline = -math.inf
+            if self._events is not None:
+                self._apply_events()
+            now = time.time()
+            self._promote_due(now)
+            if self._headroom_due:
+                self._check_headroom()
+            if self._dump_requested:
+                self._dump_open_sites()
+            if now >= self._next_periodic:
+                self._do_periodic_tasks()
+                self._next_periodic = now + self.sleep_interval
+            self.long_term_store.flush()
+            with condition:
+                if not self.is_open:
+                    break
+                timeout = self._get_wait_timeout()
+                self._wait_deadline = (
+                    math.inf if timeout is None else time.time() + timeout
+                )
+                if (
+                    self._headroom_due
+                    or self._dump_requested
+                    or self._new_promotions
+                    or (self._events is not None and self._events.is_half_full())
+                ):
+                    continue  # Requested or queued since they were last checked
+                if timeout is None or timeout > 0:
+                    condition.wait(timeout)
+        self.long_term_store.flush()
 
 
-def _get_subject(args, kwargs):
+def _is_closed(subject: Any) -> bool:
+    if subject is None:
+        return True  # The subject was garbage collected
+    if isinstance(subject, socket.socket):
+        return subject.fileno() == -1
+    try:
+        return getattr(subject, "closed", False) is True
+    except ValueError:
+        return True  # The file was detached
+
+
+def _snapshot(mapping: MutableMapping) -> dict:
+    """Copy a mapping which may be modified by other threads, so it can be iterated safely"""
+    snapshot = getattr(mapping, "snapshot", None)
+    if snapshot is None:
+        return dict(mapping)  # Copying a dict is atomic
+    return snapshot()
+
+
+def _get_subject(args, kwargs, name: str = "self"):
     if len(args) >= 1:
         return args[0]
-    return kwargs["self"]
+    return kwargs[name]
+
+
+def _get_arg(args, kwargs, index: int, name: str):
+    if len(args) > index:
+        return args[index]
+    return kwargs.get(name)
+
+
+def _raw_fd_key(fd: int) -> int:
+    """
+    Key for a raw file descriptor in the short term store. Other keys are object ids (Which are
+    never negative), so raw file descriptors can never clash with them.
+    """
+    return -1 - fd
@@ -0,0 +1,75 @@
+from bisect import bisect_right
+from dataclasses import dataclass, field
+import math
+import os
+from typing import Callable
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Not available on windows
+    resource = None
+
+
+@dataclass
+class HeadroomMonitor:
+    """
+    Monitor for the number of open file descriptors relative to the soft RLIMIT_NOFILE limit, at
+    which opens start failing with "Too many open files". Watermarks are fractions of the limit.
+    (A lower limit may be given instead, to warn well before opens fail)
+
+    The number open is estimated from the number tracked plus the number which were open but not
+    tracked (e.g.: Opened by C extensions, or expected by a classifier) when the directory at
+    path was last counted, so checking it between counts costs nothing.
+    """
+
+    watermarks: list[float] = field(default_factory=lambda: [0.5, 0.75, 0.9])
+    top_n: int = 10
+    path: str = "/proc/self/fd"
+    limit: int | None = None
+    num_untracked: int = 0
+    level: int = 0
+    _thresholds: list[int] = field(default_factory=list)
+
+    def read_limit(self) -> int | None:
+        """
+        Read the soft limit on open file descriptors (Unless a limit was given), which is None if
+        unlimited
+        """
+        if self.limit is None and resource is not None:
+            soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+            self.limit = None if soft == resource.RLIM_INFINITY else soft
+        if self.limit is not None:
+            self._thresholds = sorted(
+                math.ceil(watermark * self.limit) for watermark in self.watermarks
+            )
+        return self.limit
+
+    def count(self, get_num_tracked: Callable[[], int]) -> int:
+        """
+        Estimate the number of open file descriptors, counting them at path if possible. The
+        number tracked is read both before and after listing, and the larger used, so that
+        descriptors opened while listing are not mistaken for untracked ones.
+        """
+        num_tracked = get_num_tracked()
+        try:
+            # The descriptor used to list the directory is itself listed
+            num_open = len(os.listdir(self.path)) - 1
+        except OSError:
+            return num_tracked + self.num_untracked
+        num_tracked = max(num_tracked, get_num_tracked())
+        self.num_untracked = max(num_open - num_tracked, 0)
+        return num_open
+
+    def get_level(self, num_open: int) -> int:
+        """Get the number of watermarks which the number of open file descriptors is at or over"""
+        return bisect_right(self._thresholds, num_open)
+
+    def get_threshold(self) -> float:
+        """Get the number of tracked file descriptors at which the next watermark is reached"""
+        if self.level >= len(self._thresholds):
+            return math.inf
+        return self._thresholds[self.level] - self.num_untracked
+
+    def get_watermark(self, level: int) -> float:
+        """Get the fraction of the limit for the watermark at the (1 based) level given"""
+        return sorted(self.watermarks)[level - 1]
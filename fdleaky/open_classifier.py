@@ -0,0 +1,83 @@
+from collections import Counter
+from dataclasses import dataclass, field
+import socket
+from typing import Any
+
+# Flags which may be combined with the type passed when creating a socket
+_SOCKET_TYPE_FLAGS = getattr(socket, "SOCK_NONBLOCK", 0) | getattr(
+    socket, "SOCK_CLOEXEC", 0
+)
+
+
+@dataclass
+class OpenClassifier:
+    """
+    Classifier run each time a file descriptor is opened, using only cheap signals, to identify
+    file descriptors which are expected to be long lived. (Such as database connection pools and
+    server listen sockets). Expected file descriptors are counted by the module which opened them,
+    but no stack is captured and they are not tracked.
+
+    A file descriptor is expected if any of the following match:
+    * The (family, type) of a socket - either may be None to match any value.
+    * The path of a file starts with any of the path prefixes.
+    * The mode of a file is any of the modes given.
+    * The module of the innermost caller outside fdleaky is (or is within) any of the modules.
+    """
+
+    expected_socket_kinds: list[tuple[int | None, int | None]] = field(
+        default_factory=list
+    )
+    expected_path_prefixes: list[str] = field(default_factory=list)
+    expected_modes: list[str] = field(default_factory=list)
+    expected_modules: list[str] = field(default_factory=list)
+    expected_counts: Counter = field(default_factory=Counter)
+
+    def is_expected(
+        self,
+        subject: Any,
+        module: str,
+        socket_kind: tuple[int, int] | None = None,
+    ) -> bool:
+        """
+        Determine whether the subject opened is expected to be long lived, counting it if so.
+        The socket_kind may be given for sockets which are not yet initialized.
+        """
+        if self.classify(subject, module, socket_kind):
+            self.expected_counts[module] += 1
+            return True
+        return False
+
+    def classify(
+        self,
+        subject: Any,
+        module: str,
+        socket_kind: tuple[int, int] | None = None,
+    ) -> bool:
+        if self.expected_modules and _in_modules(module, self.expected_modules):
+            return True
+        if socket_kind is None and isinstance(subject, socket.socket):
+            socket_kind = (subject.family, subject.type)
+        if socket_kind is not None:
+            family, type_ = socket_kind
+            type_ &= ~_SOCKET_TYPE_FLAGS
+            return any(
+                (expected_family is None or expected_family == family)
+                and (expected_type is None or expected_type == type_)
+                for expected_family, expected_type in self.expected_socket_kinds
+            )
+        if (
+            self.expected_modes
+            and getattr(subject, "mode", None) in self.expected_modes
+        ):
+            return True
+        if self.expected_path_prefixes:
+            name = getattr(subject, "name", None)
+            if isinstance(name, str) and name.startswith(
+                tuple(self.expected_path_prefixes)
+            ):
+                return True
+        return False
+
+
+def _in_modules(module: str, modules: list[str]) -> bool:
+    return any(module == m or module.startswith(m + ".") for m in modules)
@@ -0,0 +1,101 @@
+from dataclasses import dataclass, field
+import os
+import time
+from typing import Any
+
+
+@dataclass
+class ProcFd:
+    """File descriptor listed in /proc/self/fd"""
+
+    fd: int
+    target: str
+    first_seen: float
+
+
+@dataclass
+class ProcFdScan:
+    """Result of comparing the file descriptors listed in /proc/self/fd with those tracked"""
+
+    untracked: list[ProcFd]
+    stale: list[int]
+
+
+@dataclass
+class ProcFdScanner:
+    """
+    Scanner for the file descriptors which are actually open in the current process, including
+    those opened by C extensions which are invisible to the tracker. Link targets are only resolved
+    for file descriptors which were not present in the previous scan, so repeated scans cost little
+    more than listing the directory.
+
+    Ignored file descriptors (e.g.: Those open before tracking started, or deliberately not
+    tracked) are not reported as untracked, until a scan finds them closed - so their numbers are
+    reported once reused.
+    """
+
+    path: str = "/proc/self/fd"
+    seen: dict[int, ProcFd] = field(default_factory=dict)
+    ignored: set[int] = field(default_factory=set)
+
+    def is_available(self) -> bool:
+        return os.path.isdir(self.path)
+
+    def ignore_open(self):
+        """Ignore the file descriptors open now (Such as stdin, stdout and stderr)"""
+        with os.scandir(self.path) as entries:
+            self.ignored.update(int(entry.name) for entry in entries)
+
+    def ignore(self, subject: Any):
+        """Ignore the file descriptor of a file, socket or integer file descriptor"""
+        fileno = get_fileno(subject)
+        if fileno is not None:
+            self.ignored.add(fileno)
+
+    def scan(self, tracked_fds: set[int]) -> ProcFdScan:
+        """
+        Compare the open file descriptors with those tracked. (tracked_fds should be determined
+        before calling this so that file descriptors opened concurrently are not reported as stale)
+        """
+        now = time.time()
+        seen = self.seen
+        ignored = self.ignored
+        # Anything ignored while listing is kept, even if it was opened after being listed
+        previously_ignored = set(ignored)
+        own_target = os.path.realpath(self.path)
+        current = {}
+        with os.scandir(self.path) as entries:
+            for entry in entries:
+                fd = int(entry.name)
+                proc_fd = seen.get(fd)
+                if proc_fd is None:
+                    try:
+                        target = os.readlink(entry.path)
+                    except OSError:
+                        continue  # Closed since the directory was listed
+                    if target == own_target:
+                        continue  # The descriptor used to list the directory
+                    proc_fd = ProcFd(fd, target, now)
+                current[fd] = proc_fd
+        self.seen = current
+        ignored.difference_update(previously_ignored.difference(current))
+        untracked = [
+            proc_fd
+            for fd, proc_fd in current.items()
+            if fd not in tracked_fds and fd not in ignored
+        ]
+        stale = [fd for fd in tracked_fds if fd not in current]
+        return ProcFdScan(untracked, stale)
+
+
+def get_fileno(subject: Any) -> int | None:
+    """Get the file descriptor of a file, socket or integer file descriptor, if still open"""
+    if isinstance(subject, int):
+        return subject
+    try:
+        fileno = subject.fileno()
+    except Exception:  # pylint: disable=W0703
+        return None  # Closed, detached or collected
+    if isinstance(fileno, int) and fileno >= 0:
+        return fileno
+    return None
@@ -0,0 +1,215 @@
+"""Offline report of the FdInfo objects in the directory of a DirFdInfoStore"""
+
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from typing import Iterator
+
+# Upper limits in seconds of the age buckets, with a final bucket for anything older
+AGE_BUCKET_LIMITS = [60, 600, 3600, 86400]
+AGE_BUCKET_LABELS = ["<1m", "<10m", "<1h", "<1d", ">=1d"]
+
+
+@dataclass
+class GroupSummary:
+    """
+    Summary of the FdInfo objects in a group, which holds a single representative stack (That of
+    the oldest) however many it summarizes.
+    """
+
+    key: str
+    identifier: str
+    stack: list[str]
+    oldest: float
+    newest: float
+    count: int = 0
+    ages: list[int] = field(default_factory=lambda: [0] * len(AGE_BUCKET_LABELS))
+
+    def add(self, identifier: str, stack: list[str], created_at: float, now: float):
+        if created_at < self.oldest:
+            self.identifier, self.stack, self.oldest = identifier, stack, created_at
+        self.newest = max(self.newest, created_at)
+        self.count += 1
+        age = now - created_at
+        bucket = sum(1 for limit in AGE_BUCKET_LIMITS if age >= limit)
+        self.ages[bucket] += 1
+
+    def merge(self, other: "GroupSummary"):
+        if other.oldest < self.oldest:
+            self.identifier, self.stack, self.oldest = (
+                other.identifier,
+                other.stack,
+                other.oldest,
+            )
+        self.newest = max(self.newest, other.newest)
+        self.count += other.count
+        self.ages = [a + b for a, b in zip(self.ages, other.ages)]
+
+
+@dataclass
+class Report:
+    """
+    Groups of FdInfo objects, by identifier or by a fingerprint of the full stack. Once max_groups
+    groups exist, FdInfo objects which would start a new group are only counted in num_ungrouped,
+    so memory is bounded however many are read.
+    """
+
+    max_groups: int = 10_000
+    groups: dict[str, GroupSummary] = field(default_factory=dict)
+    num_records: int = 0
+    num_errors: int = 0
+    num_ungrouped: int = 0
+
+    def merge(self, groups: dict[str, GroupSummary], num_errors: int):
+        for key, summary in groups.items():
+            self.num_records += summary.count
+            existing = self.groups.get(key)
+            if existing is not None:
+                existing.merge(summary)
+            elif len(self.groups) < self.max_groups:
+                self.groups[key] = summary
+            else:
+                self.num_ungrouped += summary.count
+        self.num_errors += num_errors
+
+    def get_top(self, top_n: int) -> list[GroupSummary]:
+        return sorted(self.groups.values(), key=lambda s: (-s.count, s.oldest))[:top_n]
+
+
+def get_fingerprint(stack: list[str]) -> str:
+    """Get a short fingerprint of a full stack"""
+    return hashlib.sha1("".join(stack).encode("utf-8")).hexdigest()[:12]
+
+
+def summarize_batch(
+    paths: list[str], group_by: str, now: float
+) -> tuple[dict[str, GroupSummary], int]:
+    """Summarize a batch of FdInfo json files by group, returning them with a count of errors"""
+    groups = {}
+    num_errors = 0
+    for path in paths:
+        try:
+            with open(path, encoding="utf-8") as file:
+                json_obj = json.load(file)
+            identifier = json_obj["identifier"]
+            stack = json_obj["stack"]
+            created_at = datetime.fromisoformat(json_obj["created_at"]).timestamp()
+        except (OSError, ValueError, KeyError, TypeError):
+            num_errors += 1  # Deleted or still being written
+            continue
+        key = identifier if group_by == "identifier" else get_fingerprint(stack)
+        summary = groups.get(key)
+        if summary is None:
+            summary = groups[key] = GroupSummary(
+                key, identifier, stack, created_at, created_at
+            )
+        summary.add(identifier, stack, created_at, now)
+    return groups, num_errors
+
+
+def iter_batches(dir_: str, batch_size: int) -> Iterator[list[str]]:
+    """Iterate over the paths of json files in a directory in batches, without listing it all"""
+    batch = []
+    with os.scandir(dir_) as entries:
+        for entry in entries:
+            if entry.name.endswith(".json"):
+                batch.append(entry.path)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+    if batch:
+        yield batch
+
+
+def build_report(
+    dir_: str,
+    group_by: str = "identifier",
+    num_workers: int | None = None,
+    batch_size: int = 1000,
+    max_groups: int = 10_000,
+) -> Report:
+    """
+    Read the FdInfo json files in a directory, parsing batches of them in a process pool (Or in
+    this process if num_workers is 1). At most two batches per worker are in flight at any time.
+    """
+    now = time.time()
+    report = Report(max_groups)
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    if num_workers <= 1:
+        for batch in iter_batches(dir_, batch_size):
+            report.merge(*summarize_batch(batch, group_by, now))
+        return report
+    # Workers are spawned rather than forked, as forking a multi threaded process is unsafe
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(num_workers, mp_context=context) as executor:
+        pending = set()
+        for batch in iter_batches(dir_, batch_size):
+            if len(pending) >= num_workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    report.merge(*future.result())
+            pending.add(executor.submit(summarize_batch, batch, group_by, now))
+        for future in pending:
+            report.merge(*future.result())
+    return report
+
+
+def format_age(seconds: float) -> str:
+    if seconds < 60:
+        return f"{seconds:.1f}s"
+    if seconds < 3600:
+        return f"{seconds / 60:.1f}m"
+    if seconds < 86400:
+        return f"{seconds / 3600:.1f}h"
+    return f"{seconds / 86400:.1f}d"
+
+
+def print_report(report: Report, top_n: int):
+    now = time.time()
+    print(f"{report.num_records} records in {len(report.groups)} groups")
+    if report.num_ungrouped:
+        print(f"{report.num_ungrouped} records beyond {report.max_groups} groups")
+    if report.num_errors:
+        print(f"{report.num_errors} files could not be read")
+    for index, summary in enumerate(report.get_top(top_n), 1):
+        ages = ", ".join(
+            f"{label}: {count}" for label, count in zip(AGE_BUCKET_LABELS, summary.ages)
+        )
+        print()
+        print(
+            f"#{index}: {summary.count} records, oldest {format_age(now - summary.oldest)}, "
+            f"newest {format_age(now - summary.newest)}"
+        )
+        print(f"  Ages: {ages}")
+        print(f"  Identifier: {summary.identifier}")
+        print("  Stack:")
+        for line in "".join(summary.stack).splitlines():
+            print(f"    {line}")
+
+
+def main(argv: list[str]):
+    """Entry point for python -m fdleaky report"""
+    parser = argparse.ArgumentParser(
+        prog="python -m fdleaky report",
+        description="Report the leaking file descriptors stored in a directory",
+    )
+    parser.add_argument("dir", help="Directory of a DirFdInfoStore")
+    parser.add_argument(
+        "--group-by", choices=["identifier", "stack"], default="identifier"
+    )
+    parser.add_argument("--top", type=int, default=10, help="Number of groups shown")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--max-groups", type=int, default=10_000)
+    args = parser.parse_args(argv)
+    report = build_report(
+        args.dir, args.group_by, args.workers, args.batch_size, args.max_groups
+    )
+    print_report(report, args.top)
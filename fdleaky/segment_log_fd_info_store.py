@@ -0,0 +1,184 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+import io
+import json
+import os
+from pathlib import Path
+from threading import RLock
+from typing import Iterator
+
+from fdleaky.fd_info import FdInfo
+from fdleaky.fd_info_store import FdInfoStore
+
+_SEGMENT_PREFIX = "segment-"
+_SEGMENT_SUFFIX = ".log"
+
+
+# pylint: disable=R0902
+@dataclass
+class SegmentLogFdInfoStore(FdInfoStore):
+    """
+    Store which appends a compact JSON line for each create and delete to a log split into
+    segment files, rather than creating and unlinking a file for each FdInfo. Records are
+    buffered in memory and written in large chunks (When the buffer is full, or when flushed by
+    the tracker), and files are opened with io.FileIO, which is never tracked.
+
+    Once the active segment exceeds max_segment_size a new segment is started, and once there are
+    more than max_segments segments, the log is compacted into a single segment containing only
+    the FdInfo objects which have not been deleted. (Compaction may also be requested directly).
+    The current set of live FdInfo objects can be rebuilt from the log using read_all.
+    """
+
+    dir: Path = Path("fdleaky/")
+    max_segment_size: int = 16 * 1024 * 1024
+    max_segments: int = 8
+    buffer_size: int = 256 * 1024
+    _live_ids: set[str] | None = None
+    _segment_index: int = 0
+    _segment_size: int = 0
+    _writer: io.BufferedWriter | None = None
+    _lock: RLock = field(default_factory=RLock)
+
+    def create(self, fd_info: FdInfo):
+        with self._lock:
+            self._get_live_ids().add(fd_info.id)
+            self._append(_to_record(fd_info))
+
+    def delete(self, stored_id: str) -> bool:
+        with self._lock:
+            live_ids = self._get_live_ids()
+            if stored_id not in live_ids:
+                return False
+            live_ids.remove(stored_id)
+            self._append({"op": "delete", "id": stored_id})
+            return True
+
+    def flush(self):
+        with self._lock:
+            if self._writer is not None:
+                self._writer.flush()
+
+    def close(self):
+        """Flush any buffered records and close the active segment"""
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+    def read_all(self) -> dict[str, FdInfo]:
+        """Rebuild the FdInfo objects which have been created and not deleted, keyed on id"""
+        with self._lock:
+            self.flush()
+            return _replay(self._get_segment_paths())
+
+    def compact(self):
+        """Replace all segments with a single segment containing only live FdInfo objects"""
+        with self._lock:
+            self.close()
+            segment_paths = self._get_segment_paths()
+            fd_infos = _replay(segment_paths)
+            # The compacted segment is written to a temporary file and renamed, so a failure part
+            # way through leaves the existing segments untouched. Replaying the old segments
+            # followed by the compacted one gives the same result, so the order of removal is safe
+            index = self._segment_index + 1
+            path = self._get_segment_path(index)
+            tmp_path = path.with_name(path.name + ".tmp")
+            size = 0
+            with io.BufferedWriter(
+                io.FileIO(tmp_path, "w"), self.buffer_size
+            ) as writer:
+                for fd_info in fd_infos.values():
+                    size += writer.write(_encode(_to_record(fd_info)))
+            os.replace(tmp_path, path)
+            for segment_path in segment_paths:
+                segment_path.unlink()
+            self._live_ids = set(fd_infos)
+            self._segment_index = index
+            self._segment_size = size
+
+    def _get_live_ids(self) -> set[str]:
+        live_ids = self._live_ids
+        if live_ids is None:
+            # Resume in a new segment, in case the last one ends in a partial record
+            segment_paths = self._get_segment_paths()
+            live_ids = self._live_ids = set(_replay(segment_paths))
+            if segment_paths:
+                self._segment_index = _get_index(segment_paths[-1]) + 1
+        return live_ids
+
+    def _append(self, record: dict):
+        data = _encode(record)
+        if (
+            self._segment_size + len(data) > self.max_segment_size
+            and self._segment_size
+        ):
+            self._rotate()
+        writer = self._writer
+        if writer is None:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            raw = io.FileIO(self._get_segment_path(self._segment_index), "a")
+            writer = self._writer = io.BufferedWriter(raw, self.buffer_size)
+        writer.write(data)
+        self._segment_size += len(data)
+
+    def _rotate(self):
+        if len(self._get_segment_paths()) >= self.max_segments:
+            self.compact()
+        else:
+            self.close()
+            self._segment_index += 1
+            self._segment_size = 0
+
+    def _get_segment_path(self, index: int) -> Path:
+        return self.dir / f"{_SEGMENT_PREFIX}{index:08d}{_SEGMENT_SUFFIX}"
+
+    def _get_segment_paths(self) -> list[Path]:
+        if not self.dir.is_dir():
+            return []
+        return sorted(
+            self.dir.glob(f"{_SEGMENT_PREFIX}*{_SEGMENT_SUFFIX}"), key=_get_index
+        )
+
+
+def _get_index(path: Path) -> int:
+    return int(path.name[len(_SEGMENT_PREFIX) : -len(_SEGMENT_SUFFIX)])
+
+
+def _to_record(fd_info: FdInfo) -> dict:
+    return {
+        "op": "create",
+        "id": fd_info.id,
+        "identifier": fd_info.identifier,
+        "stack": fd_info.stack,
+        "created_at": fd_info.created_at.isoformat(),
+    }
+
+
+def _encode(record: dict) -> bytes:
+    return (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def _read_records(path: Path) -> Iterator[dict]:
+    with io.BufferedReader(io.FileIO(path, "r")) as reader:
+        for line in reader:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # A truncated final record from a process which did not exit cleanly
+                continue
+
+
+def _replay(segment_paths: list[Path]) -> dict[str, FdInfo]:
+    fd_infos = {}
+    for path in segment_paths:
+        for record in _read_records(path):
+            if record["op"] == "create":
+                fd_infos[record["id"]] = FdInfo(
+                    identifier=record["identifier"],
+                    stack=record["stack"],
+                    created_at=datetime.fromisoformat(record["created_at"]),
+                    id=record["id"],
+                )
+            else:
+                fd_infos.pop(record["id"], None)
+    return fd_infos
@@ -0,0 +1,69 @@
+from collections.abc import Iterator, MutableMapping
+from threading import Lock
+from typing import Any
+
+_MISSING = object()
+
+
+class ShardedDict(MutableMapping[int, Any]):
+    """
+    Mapping for tracker state which is striped across a number of dicts, each with its own lock,
+    by the hash of the key. Threads opening and closing file descriptors concurrently rarely need
+    the same lock, which matters on free threaded builds of python, where operations on a single
+    dict contend. snapshot gives a consistent copy of all shards for the worker to iterate.
+    """
+
+    def __init__(self, num_shards: int = 16):
+        if num_shards < 1 or num_shards & (num_shards - 1):
+            raise ValueError(f"num_shards must be a power of 2: {num_shards}")
+        self._mask = num_shards - 1
+        self._shards: list[dict[int, Any]] = [{} for _ in range(num_shards)]
+        self._locks = [Lock() for _ in range(num_shards)]
+
+    def _get_index(self, key: int) -> int:
+        # Keys are typically object ids, whose low bits are always zero due to alignment
+        key_hash = hash(key)
+        return (key_hash ^ (key_hash >> 4)) & self._mask
+
+    def __getitem__(self, key: int) -> Any:
+        return self._shards[self._get_index(key)][key]
+
+    def get(self, key: int, default: Any = None) -> Any:
+        return self._shards[self._get_index(key)].get(key, default)
+
+    def __setitem__(self, key: int, value: Any):
+        index = self._get_index(key)
+        with self._locks[index]:
+            self._shards[index][key] = value
+
+    def __delitem__(self, key: int):
+        index = self._get_index(key)
+        with self._locks[index]:
+            del self._shards[index][key]
+
+    def pop(self, key: int, default: Any = _MISSING) -> Any:
+        index = self._get_index(key)
+        with self._locks[index]:
+            if default is _MISSING:
+                return self._shards[index].pop(key)
+            return self._shards[index].pop(key, default)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.snapshot())
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+    def snapshot(self) -> dict[int, Any]:
+        """Get a copy of the contents of all shards, as of a single point in time"""
+        locks = self._locks
+        for lock in locks:
+            lock.acquire()
+        try:
+            result = {}
+            for shard in self._shards:
+                result.update(shard)
+            return result
+        finally:
+            for lock in locks:
+                lock.release()
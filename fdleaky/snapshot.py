@@ -0,0 +1,52 @@
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping
+
+from fdleaky.stack import stack_table
+
+
+@dataclass(frozen=True)
+class SiteDiff:
+    """Change in the number of file descriptors open at a call site between two snapshots"""
+
+    site_id: int
+    num_open: int
+    delta: int
+
+    @property
+    def site(self) -> str:
+        return stack_table.get_stack(self.site_id)[0].strip()
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """
+    Immutable view of the number of file descriptors open at each call site (Keyed on the stack
+    id of the site) at the time it was taken. As with tracemalloc, a snapshot taken before some
+    operation may be compared with one taken after to find the sites which leaked.
+    """
+
+    sites: Mapping[int, int]
+    taken_at: float
+
+    def __post_init__(self):
+        if not isinstance(self.sites, MappingProxyType):
+            object.__setattr__(self, "sites", MappingProxyType(dict(self.sites)))
+
+    @property
+    def num_open(self) -> int:
+        return sum(self.sites.values())
+
+    def compare_to(self, other: "Snapshot") -> list[SiteDiff]:
+        """
+        Get the sites with more file descriptors open in this snapshot than in the other (Usually
+        older) snapshot, largest increase first
+        """
+        other_sites = other.sites
+        diffs = []
+        for site_id, num_open in self.sites.items():
+            delta = num_open - other_sites.get(site_id, 0)
+            if delta > 0:
+                diffs.append(SiteDiff(site_id, num_open, delta))
+        diffs.sort(key=lambda diff: (-diff.delta, -diff.num_open, diff.site_id))
+        return diffs
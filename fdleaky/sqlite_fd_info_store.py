@@ -0,0 +1,133 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+import hashlib
+import json
+from pathlib import Path
+import sqlite3
+from threading import RLock
+
+from fdleaky.fd_info import FdInfo
+from fdleaky.fd_info_store import FdInfoStore
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stack (
+    id INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL UNIQUE,
+    frames TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fd_info (
+    id TEXT PRIMARY KEY,
+    identifier TEXT NOT NULL,
+    stack_id INTEGER NOT NULL REFERENCES stack(id),
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS fd_info_identifier ON fd_info(identifier);
+CREATE INDEX IF NOT EXISTS fd_info_created_at ON fd_info(created_at);
+"""
+
+
+@dataclass
+class SqliteFdInfoStore(FdInfoStore):
+    """
+    Store backed by a local SQLite database in WAL mode, so leaks may be queried while the
+    application is running. Each stack is stored once in the stack table and referenced from the
+    fd_info table, which is indexed on identifier and created_at.
+
+    Changes are grouped into a single transaction, which is committed when the store is flushed
+    (The tracker does this once each time its worker wakes). SQLite opens its files in C, so they
+    are never tracked.
+    """
+
+    path: Path = Path("fdleaky.db")
+    _connection: sqlite3.Connection | None = None
+    _stack_ids: dict[str, int] = field(default_factory=dict)
+    _lock: RLock = field(default_factory=RLock)
+
+    def create(self, fd_info: FdInfo):
+        with self._lock:
+            connection = self._begin()
+            connection.execute(
+                "INSERT OR REPLACE INTO fd_info (id, identifier, stack_id, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (
+                    fd_info.id,
+                    fd_info.identifier,
+                    self._get_stack_id(fd_info.stack),
+                    fd_info.created_at.isoformat(),
+                ),
+            )
+
+    def delete(self, stored_id: str) -> bool:
+        with self._lock:
+            cursor = self._begin().execute(
+                "DELETE FROM fd_info WHERE id = ?", (stored_id,)
+            )
+            return cursor.rowcount > 0
+
+    def flush(self):
+        with self._lock:
+            connection = self._connection
+            if connection is not None and connection.in_transaction:
+                connection.commit()
+
+    def close(self):
+        """Commit any pending changes and close the connection"""
+        with self._lock:
+            if self._connection is not None:
+                self.flush()
+                self._connection.close()
+                self._connection = None
+                self._stack_ids.clear()
+
+    def read_all(self) -> dict[str, FdInfo]:
+        """Get all stored FdInfo objects, keyed on id"""
+        with self._lock:
+            self.flush()
+            rows = self._get_connection().execute(
+                "SELECT fd_info.id, identifier, frames, created_at FROM fd_info "
+                "JOIN stack ON stack.id = fd_info.stack_id ORDER BY created_at"
+            )
+            return {
+                row[0]: FdInfo(
+                    identifier=row[1],
+                    stack=json.loads(row[2]),
+                    created_at=datetime.fromisoformat(row[3]),
+                    id=row[0],
+                )
+                for row in rows
+            }
+
+    def _get_connection(self) -> sqlite3.Connection:
+        connection = self._connection
+        if connection is None:
+            # Transactions are managed explicitly, and the connection is used from the worker
+            connection = sqlite3.connect(
+                self.path, isolation_level=None, check_same_thread=False
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_SCHEMA)
+            self._connection = connection
+        return connection
+
+    def _begin(self) -> sqlite3.Connection:
+        connection = self._get_connection()
+        if not connection.in_transaction:
+            connection.execute("BEGIN")
+        return connection
+
+    def _get_stack_id(self, stack: list[str]) -> int:
+        frames = json.dumps(stack, separators=(",", ":"))
+        stack_hash = hashlib.sha1(frames.encode("utf-8")).hexdigest()
+        stack_id = self._stack_ids.get(stack_hash)
+        if stack_id is None:
+            connection = self._connection
+            connection.execute(
+                "INSERT OR IGNORE INTO stack (hash, frames) VALUES (?, ?)",
+                (stack_hash, frames),
+            )
+            stack_id = connection.execute(
+                "SELECT id FROM stack WHERE hash = ?", (stack_hash,)
+            ).fetchone()[0]
+            self._stack_ids[stack_hash] = stack_id
+        return stack_id
@@ -0,0 +1,209 @@
+import linecache
+import os
+import sys
+import sysconfig
+from threading import Lock
+from types import CodeType, FrameType
+
+# Code objects compare equal regardless of their filename, so it is included in each frame
+Frame = tuple[CodeType, int | None, str] | str
+_PACKAGE_DIR = os.path.dirname(__file__) + os.sep
+_PATHS = sysconfig.get_paths()
+_STDLIB_DIRS = tuple(
+    {_PATHS["stdlib"] + os.sep, _PATHS["platstdlib"] + os.sep, "<frozen "}
+)
+_SITE_DIRS = tuple({_PATHS["purelib"] + os.sep, _PATHS["platlib"] + os.sep})
+
+
+def capture_frames(skip: int = 0) -> tuple[Frame, ...]:
+    """
+    Capture the code object and line number for each frame in the stack of the caller, outermost
+    first. This is much cheaper than traceback.format_stack, as no source lines are read and no
+    strings are built.
+    """
+    frames = []
+    frame = sys._getframe(skip + 1)  # pylint: disable=W0212
+    while frame is not None:
+        code = frame.f_code
+        frames.append((code, frame.f_lineno, code.co_filename))
+        frame = frame.f_back
+    frames.reverse()
+    return tuple(frames)
+
+
+def _get_call_frame(skip: int) -> FrameType:
+    frame = sys._getframe(skip + 1)  # pylint: disable=W0212
+    while frame.f_back is not None and frame.f_code.co_filename.startswith(
+        _PACKAGE_DIR
+    ):
+        frame = frame.f_back
+    return frame
+
+
+def get_call_site(skip: int = 0) -> Frame:
+    """Get the innermost frame in the stack of the caller which is not part of fdleaky"""
+    frame = _get_call_frame(skip + 1)
+    code = frame.f_code
+    return (code, frame.f_lineno, code.co_filename)
+
+
+def get_call_module(skip: int = 0) -> str:
+    """Get the name of the module for the innermost frame of the caller not part of fdleaky"""
+    return _get_call_frame(skip + 1).f_globals.get("__name__", "")
+
+
+def is_internal_frame(frame: Frame) -> bool:
+    """Determine if a frame is part of fdleaky"""
+    if isinstance(frame, str):
+        return f'File "{_PACKAGE_DIR}' in frame
+    return frame[2].startswith(_PACKAGE_DIR)
+
+
+def is_stdlib_frame(frame: Frame) -> bool:
+    """Determine if a frame is part of the python standard library (Including asyncio)"""
+    if isinstance(frame, str):
+        filename = frame.split('"', 2)[1] if '"' in frame else ""
+    else:
+        filename = frame[2]
+    return filename.startswith(_STDLIB_DIRS) and not filename.startswith(_SITE_DIRS)
+
+
+def trim_frames(frames: tuple[Frame, ...]) -> tuple[Frame, ...]:
+    """
+    Remove frames for fdleaky, and for the standard library outside the innermost frame which is
+    not part of either (Such as threading, runpy and the asyncio event loop). Standard library
+    frames inside this frame are kept, as they show how the file descriptor was opened.
+    """
+    frames = tuple(frame for frame in frames if not is_internal_frame(frame))
+    for index in range(len(frames) - 1, -1, -1):
+        if not is_stdlib_frame(frames[index]):
+            return (
+                tuple(frame for frame in frames[:index] if not is_stdlib_frame(frame))
+                + frames[index:]
+            )
+    return frames
+
+
+def is_in_scope(
+    scope: dict[int, tuple[CodeType, bool]],
+    packages: tuple[str, ...],
+    path_prefixes: tuple[str, ...],
+    max_depth: int,
+    skip: int = 0,
+) -> bool:
+    """
+    Determine whether any of the innermost max_depth frames of the caller are in any of the
+    packages (Each given with a trailing ".") or have a filename starting with any of the path
+    prefixes. No frames are captured or formatted, and the result for each code object is cached
+    in the scope dict given, keyed on its id. (Code objects which compare equal may be from
+    different files, and the code object is kept so its id is not reused)
+    """
+    frame = sys._getframe(skip + 1)  # pylint: disable=W0212
+    while frame is not None and max_depth > 0:
+        code = frame.f_code
+        cached = scope.get(id(code))
+        if cached is not None and cached[0] is code:
+            in_scope = cached[1]
+        else:
+            in_scope = code.co_filename.startswith(path_prefixes) or (
+                frame.f_globals.get("__name__", "") + "."
+            ).startswith(packages)
+            scope[id(code)] = (code, in_scope)
+        if in_scope:
+            return True
+        frame = frame.f_back
+        max_depth -= 1
+    return False
+
+
+def format_frame(frame: Frame) -> str:
+    """Format a frame the same way traceback.format_stack does"""
+    if isinstance(frame, str):
+        return frame
+    code, lineno, filename = frame
+    result = f'  File "{filename}", line {lineno}, in {code.co_name}\n'
+    if lineno:
+        line = linecache.getline(filename, lineno).strip()
+        if line:
+            result += f"    {line}\n"
+    return result
+
+
+class StackTable:
+    """
+    Interning table for stacks. In a typical application, almost all file descriptors are opened
+    from a handful of call sites, so each unique stack is stored once and referenced by a small
+    integer id. Frames are formatted at most once per process, the first time a stack containing
+    them is requested. Frames may also be strings which have already been formatted.
+    """
+
+    def __init__(self):
+        self._ids: dict[tuple[Frame, ...], int] = {}
+        self._stacks: list[tuple[Frame, ...]] = []
+        self._formatted_frames: dict[Frame, str] = {}
+        self._site_ids: dict[int, int] = {}
+        self._trimmed_ids: dict[int, int] = {}
+        self._lock = Lock()
+
+    def intern(self, frames: tuple[Frame, ...], site_id: int | None = None) -> int:
+        """
+        Get the id for a stack, adding it to the table if required. If the site_id is not given,
+        it is derived from the frames on demand.
+        """
+        stack_id = self._ids.get(frames)
+        if stack_id is None:
+            with self._lock:
+                stack_id = self._ids.get(frames)
+                if stack_id is None:
+                    stack_id = len(self._stacks)
+                    self._stacks.append(frames)
+                    if site_id is not None:
+                        self._site_ids[stack_id] = site_id
+                    self._ids[frames] = stack_id
+        return stack_id
+
+    def get_frames(self, stack_id: int) -> tuple[Frame, ...]:
+        return self._stacks[stack_id]
+
+    def get_stack(self, stack_id: int) -> list[str]:
+        return [self.format_frame(frame) for frame in self._stacks[stack_id]]
+
+    def get_trimmed_id(self, stack_id: int) -> int:
+        """Get the id of the stack with the frames removed by trim_frames"""
+        trimmed_id = self._trimmed_ids.get(stack_id)
+        if trimmed_id is None:
+            frames = trim_frames(self._stacks[stack_id]) or self._stacks[stack_id]
+            trimmed_id = self._trimmed_ids[stack_id] = self.intern(frames)
+        return trimmed_id
+
+    def get_site_id(self, stack_id: int) -> int:
+        """
+        Get the id of the single frame stack for the call site of a stack - the innermost frame
+        which is not part of fdleaky
+        """
+        site_id = self._site_ids.get(stack_id)
+        if site_id is None:
+            frames = self._stacks[stack_id]
+            site = next(
+                (frame for frame in reversed(frames) if not is_internal_frame(frame)),
+                frames[0],
+            )
+            site_id = self._site_ids[stack_id] = self.intern((site,))
+        return site_id
+
+    def format_frame(self, frame: Frame) -> str:
+        formatted = self._formatted_frames.get(frame)
+        if formatted is None:
+            formatted = self._formatted_frames[frame] = format_frame(frame)
+        return formatted
+
+    def __len__(self) -> int:
+        return len(self._stacks)
+
+
+stack_table = StackTable()
+
+
+def capture_stack_id(skip: int = 0) -> int:
+    """Capture the stack of the caller, returning its id within the stack table"""
+    return stack_table.intern(capture_frames(skip + 1))
@@ -0,0 +1,84 @@
+from dataclasses import dataclass, field
+import heapq
+
+from fdleaky.site_stats import SiteStats
+
+
+@dataclass(slots=True)
+class SiteTrend:
+    """Exponentially weighted rate of change in the number of open file descriptors for a site"""
+
+    num_open: int
+    sampled_at: float
+    slope: float = 0.0
+    num_samples: int = 0
+
+
+@dataclass
+class TrendDetector:
+    """
+    Samples the number of open file descriptors for each call site each time the worker runs its
+    periodic tasks, maintaining an exponentially weighted moving average of its rate of change
+    (In file descriptors per second). A site is flagged as growing once it has been sampled at
+    least min_samples times with a slope of at least min_slope, regardless of the age of any
+    individual file descriptor.
+
+    Trends are kept for at most max_sites sites, and sites with no open file descriptors are
+    forgotten, so memory is bounded. Once max_sites trends exist, a new site replaces the sampled
+    trend with the lowest slope which is not growing, so no site is refused a trend for good.
+    """
+
+    alpha: float = 0.2
+    min_slope: float = 1 / 60
+    min_samples: int = 12
+    max_sites: int = 1000
+    trends: dict[int, SiteTrend] = field(default_factory=dict)
+
+    def sample(self, sites: dict[int, SiteStats], now: float) -> set[int]:
+        """Sample the open count of each site, returning the ids of sites which are growing"""
+        trends = self.trends
+        alpha = self.alpha
+        growing = set()
+        new_sites = []
+        for site_id, stats in list(sites.items()):
+            num_open = stats.num_open
+            trend = trends.get(site_id)
+            if trend is None:
+                if num_open > 0:
+                    new_sites.append((site_id, num_open))
+                continue
+            if num_open <= 0:
+                del trends[site_id]
+                continue
+            elapsed = now - trend.sampled_at
+            if elapsed <= 0:
+                continue
+            rate = (num_open - trend.num_open) / elapsed
+            trend.slope += alpha * (rate - trend.slope)
+            trend.num_open = num_open
+            trend.sampled_at = now
+            trend.num_samples += 1
+            if trend.num_samples >= self.min_samples and trend.slope >= self.min_slope:
+                growing.add(site_id)
+        if new_sites:
+            self._add_trends(new_sites, growing, now)
+        return growing
+
+    def _add_trends(
+        self, new_sites: list[tuple[int, int]], growing: set[int], now: float
+    ):
+        """Add trends for new sites, evicting the lowest slopes to make room"""
+        trends = self.trends
+        num_evicted = len(trends) + len(new_sites) - self.max_sites
+        if num_evicted > 0:
+            evictable = (
+                site_id
+                for site_id, trend in trends.items()
+                if trend.num_samples and site_id not in growing
+            )
+            for site_id in heapq.nsmallest(
+                num_evicted, evictable, key=lambda site_id: trends[site_id].slope
+            ):
+                del trends[site_id]
+        for site_id, num_open in new_sites[: self.max_sites - len(trends)]:
+            trends[site_id] = SiteTrend(num_open, now)
@@ -0,0 +1,76 @@
+from collections.abc import Iterator, MutableMapping
+from weakref import ref
+
+from fdleaky.fd import Fd
+
+_MISSING = object()
+
+
+class _FdRef(ref):
+    """Weak reference to a subject, which also holds the other fields of its Fd"""
+
+    __slots__ = ("stack_id", "created_at")
+
+    def __new__(cls, subject, stack_id: int, created_at: float):
+        # pylint: disable=W0613
+        return super().__new__(cls, subject)
+
+    def __init__(self, subject, stack_id: int, created_at: float):
+        super().__init__(subject)
+        self.stack_id = stack_id
+        self.created_at = created_at
+
+
+class WeakFdStore(MutableMapping[int, Fd]):
+    """
+    Short term store which holds subjects by weak reference where they support it, so the store
+    does not keep them alive. (As required when use_finalizers is set) Each entry is a single weak
+    reference which also holds the stack id and open time, and Fd objects are created on demand
+    when items are read. Every operation is a single operation on a dict, so reads never see part
+    of a concurrent write, and no lock is needed.
+
+    This is not a memory optimization - each entry is larger and slower to insert than an Fd in a
+    dict. Entries are not removed when their subject is garbage collected, (The tracker's own
+    finalizers must see them first) so items may be read with a subject of None, which the tracker
+    treats as closed.
+    """
+
+    def __init__(self):
+        self._entries: dict[int, _FdRef | Fd] = {}
+
+    def __getitem__(self, key: int) -> Fd:
+        return _to_fd(self._entries[key])
+
+    def __setitem__(self, key: int, fd: Fd):
+        try:
+            entry = _FdRef(fd.subject, fd.stack_id, fd.created_at)
+        except TypeError:
+            entry = fd  # The subject does not support weak references
+        self._entries[key] = entry
+
+    def __delitem__(self, key: int):
+        del self._entries[key]
+
+    def pop(self, key: int, default=_MISSING):
+        entry = self._entries.pop(key, _MISSING)
+        if entry is _MISSING:
+            if default is _MISSING:
+                raise KeyError(key)
+            return default
+        return _to_fd(entry)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(list(self._entries))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def snapshot(self) -> dict[int, Fd]:
+        """Get a copy of the contents of the store, as of a single point in time"""
+        return {key: _to_fd(entry) for key, entry in dict(self._entries).items()}
+
+
+def _to_fd(entry: _FdRef | Fd) -> Fd:
+    if isinstance(entry, Fd):
+        return entry
+    return Fd(entry(), entry.stack_id, entry.created_at)
@@ -0,0 +1,65 @@
+from dataclasses import dataclass, field
+from threading import Lock
+
+from fdleaky.dir_fd_info_store import DirFdInfoStore
+from fdleaky.fd_info import FdInfo
+from fdleaky.fd_info_store import FdInfoStore
+
+
+@dataclass
+class WriteBehindFdInfoStore(FdInfoStore):
+    """
+    Store which queues creates and deletes in memory, applying them to another store in a batch
+    when flushed (The tracker does this once each time its worker wakes), so that closing a file
+    descriptor never does I/O on the application thread. A delete for an FdInfo whose create is
+    still queued cancels it, so neither reaches the underlying store.
+
+    The queue holds at most max_pending creates - beyond this, creates are dropped and counted in
+    num_dropped. Deletes are never dropped, as the FdInfo would otherwise remain in the store after
+    its file descriptor was closed. (Deletes are bounded by the number of FdInfo objects stored).
+    """
+
+    store: FdInfoStore = field(default_factory=DirFdInfoStore)
+    max_pending: int = 10_000
+    num_dropped: int = 0
+    _pending: dict[str, FdInfo | None] = field(default_factory=dict)
+    _lock: Lock = field(default_factory=Lock)
+    _flush_lock: Lock = field(default_factory=Lock)
+
+    def create(self, fd_info: FdInfo):
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                self.num_dropped += 1
+                return
+            self._pending[fd_info.id] = fd_info
+
+    def delete(self, stored_id: str) -> bool:
+        with self._lock:
+            pending = self._pending
+            if stored_id not in pending:
+                pending[stored_id] = None
+            elif pending[stored_id] is None:
+                return False  # Already deleted
+            else:
+                del pending[stored_id]
+            return True
+
+    def flush(self):
+        # Batches are applied in order, and without holding the lock used by delete
+        with self._flush_lock:
+            with self._lock:
+                pending = self._pending
+                if not pending:
+                    return
+                self._pending = {}
+            store = self.store
+            for stored_id, fd_info in pending.items():
+                if fd_info is None:
+                    store.delete(stored_id)
+                else:
+                    store.create(fd_info)
+            store.flush()
+
+    def close(self):
+        self.flush()
+        self.store.close()
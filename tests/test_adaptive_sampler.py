@@ -0,0 +1,103 @@
+import sys
+import threading
+
+from fdleaky.adaptive_sampler import AdaptiveSampler
+
+
+class TestAdaptiveSampler:
+    """Unit tests for the AdaptiveSampler class."""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method."""
+        self.sampler = AdaptiveSampler(max_interval=8)
+
+    def test_rising_site_always_captured(self):
+        """Test that a site whose open count keeps rising is captured on every open."""
+        # Act
+        results = [self.sampler.should_capture(1) for _ in range(100)]
+
+        # Assert
+        assert all(results)
+        assert self.sampler.sites[1].num_open == 100
+
+    def test_well_behaved_site_sampled(self):
+        """Test that a site which closes what it opens is sampled at most 1 in max_interval."""
+        # Arrange - warm up so the site has a peak of 1
+        self.sampler.should_capture(1)
+        self.sampler.on_close(1)
+
+        # Act
+        results = []
+        for _ in range(800):
+            results.append(self.sampler.should_capture(1))
+            self.sampler.on_close(1)
+
+        # Assert
+        assert 100 <= sum(results) < 110
+        state = self.sampler.sites[1]
+        assert state.open_count == 801
+        assert state.close_count == 801
+        assert state.interval == 8
+
+    def test_new_peak_resets_interval(self):
+        """Test that reaching a new peak resets the sampling interval for a site."""
+        # Arrange
+        self.sampler.should_capture(1)
+        self.sampler.on_close(1)
+        for _ in range(50):
+            self.sampler.should_capture(1)
+            self.sampler.on_close(1)
+        assert self.sampler.sites[1].interval == 8
+
+        # Act
+        self.sampler.should_capture(1)
+        result = self.sampler.should_capture(1)
+
+        # Assert
+        assert result is True
+        assert self.sampler.sites[1].interval == 1
+
+    def test_sites_independent(self):
+        """Test that counters are kept separately for each site."""
+        # Act
+        self.sampler.should_capture(1)
+        self.sampler.should_capture(2)
+        self.sampler.on_close(2)
+
+        # Assert
+        assert self.sampler.sites[1].num_open == 1
+        assert self.sampler.sites[2].num_open == 0
+
+    def test_close_unknown_site(self):
+        """Test that closing for a site that was never opened is ignored."""
+        # Act
+        self.sampler.on_close(3)
+
+        # Assert
+        assert 3 not in self.sampler.sites
+
+    def test_concurrent_updates(self):
+        """Test that no counts are lost when a site is updated from many threads."""
+
+        # Arrange
+        def open_and_close():
+            for _ in range(5000):
+                self.sampler.should_capture(1)
+                self.sampler.on_close(1)
+
+        threads = [threading.Thread(target=open_and_close) for _ in range(8)]
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+
+        # Act
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(switch_interval)
+
+        # Assert
+        state = self.sampler.sites[1]
+        assert (state.open_count, state.close_count) == (40000, 40000)
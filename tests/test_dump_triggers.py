@@ -0,0 +1,72 @@
+import os
+import signal
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from fdleaky.dump_triggers import install_signal_handler, start_keypress_listener
+from fdleaky.fd_tracker import FdTracker
+
+
+class TestDumpTriggers:
+    """Unit tests for requesting dumps from signals and keypresses."""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method."""
+        self.mock_tracker = MagicMock(spec=FdTracker)
+
+    @pytest.mark.skipif(not hasattr(signal, "SIGUSR1"), reason="Requires SIGUSR1")
+    def test_signal_handler(self):
+        """Test that receiving the signal requests a dump."""
+        # Arrange
+        previous = signal.getsignal(signal.SIGUSR1)
+
+        # Act
+        try:
+            installed = install_signal_handler(self.mock_tracker)
+            signal.raise_signal(signal.SIGUSR1)
+        finally:
+            signal.signal(signal.SIGUSR1, previous)
+
+        # Assert
+        assert installed
+        self.mock_tracker.request_dump.assert_called_once()
+
+    def test_no_signal(self):
+        """Test that no handler is installed where the signal is not available."""
+        assert not install_signal_handler(self.mock_tracker, None)
+
+    def test_keypress_listener_requires_terminal(self):
+        """Test that keypresses are not read from a stream which is not a terminal."""
+        # Arrange
+        stream = MagicMock()
+        stream.isatty.return_value = False
+
+        # Act
+        thread = start_keypress_listener(self.mock_tracker, stream=stream)
+
+        # Assert
+        assert thread is None
+        stream.fileno.assert_not_called()
+
+    def test_keypress_listener(self):
+        """Test that pressing the key requests a dump, and other keys are ignored."""
+        # Arrange
+        read_fd, write_fd = os.pipe()
+        stream = MagicMock()
+        stream.isatty.return_value = True
+        stream.fileno.return_value = read_fd
+
+        # Act
+        with patch("fdleaky.dump_triggers.termios"), patch(
+            "fdleaky.dump_triggers.tty"
+        ), patch("fdleaky.dump_triggers.atexit") as mock_atexit:
+            thread = start_keypress_listener(self.mock_tracker, stream=stream)
+        os.write(write_fd, b"xpp")
+        os.close(write_fd)
+        thread.join(5)
+        os.close(read_fd)
+
+        # Assert
+        assert self.mock_tracker.request_dump.call_count == 2
+        mock_atexit.register.assert_called_once()
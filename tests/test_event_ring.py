@@ -0,0 +1,63 @@
+from unittest.mock import MagicMock
+
+from fdleaky.event_ring import EventRing
+from fdleaky.fd import Fd
+
+
+class TestEventRing:
+    """Unit tests for the EventRing class."""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method."""
+        self.ring = EventRing(4)
+        self.fd = Fd(MagicMock(), 1)
+
+    def test_drain_in_order(self):
+        """Test that events are drained oldest first, and the ring emptied."""
+        # Arrange
+        self.ring.append_open(1, self.fd)
+        self.ring.append_close(1)
+
+        # Act
+        with self.ring.lock:
+            batch = self.ring.drain()
+
+        # Assert
+        assert [(seq, key, fd) for seq, key, fd, _ in batch] == [
+            (0, 1, self.fd),
+            (1, 1, None),
+        ]
+        assert batch[1][3] is not None
+        assert len(self.ring) == 0
+        assert self.ring.num_dropped == 0
+
+    def test_fill_levels(self):
+        """Test that the ring reports when it is half full and when it is full."""
+        # Act
+        levels = []
+        for key in range(4):
+            levels.append((self.ring.is_half_full(), self.ring.is_full()))
+            self.ring.append_close(key)
+        levels.append((self.ring.is_half_full(), self.ring.is_full()))
+
+        # Assert
+        assert levels == [
+            (False, False),
+            (False, False),
+            (True, False),
+            (True, False),
+            (True, True),
+        ]
+
+    def test_dropped_counted(self):
+        """Test that events discarded from a full ring are counted once drained."""
+        # Arrange
+        for key in range(6):
+            self.ring.append_close(key)
+
+        # Act
+        batch = self.ring.drain()
+
+        # Assert
+        assert [event[1] for event in batch] == [2, 3, 4, 5]
+        assert self.ring.num_dropped == 2
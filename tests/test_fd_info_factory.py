@@ -7,6 +7,7 @@ import pytest
 from fdleaky.fd import Fd
 from fdleaky.fd_info import FdInfo
 from fdleaky.fd_info_factory import FdInfoFactory
+from fdleaky.stack import stack_table
 
 
 class TestFdInfoFactory:
@@ -30,20 +31,26 @@ class TestFdInfoFactory:
         ]
 
         self.old_fd = Fd(
-            subject="test_subject", stack=self.test_stack, created_at=self.old_time
+            subject="test_subject",
+            stack_id=stack_table.intern(tuple(self.test_stack)),
+            created_at=self.old_time,
         )
 
         self.recent_fd = Fd(
-            subject="test_subject", stack=self.test_stack, created_at=self.recent_time
+            subject="test_subject",
+            stack_id=stack_table.intern(tuple(self.test_stack)),
+            created_at=self.recent_time,
         )
 
         self.no_match_fd = Fd(
             subject="test_subject",
-            stack=[
-                'File "/usr/lib/python3.9/socket.py", line 232, in accept',
-                'File "/usr/lib/python3.9/other_module.py", line 45, in other_function',
-                'File "/usr/lib/python3.9/another_module.py", line 78, in another_function',
-            ],
+            stack_id=stack_table.intern(
+                (
+                    'File "/usr/lib/python3.9/socket.py", line 232, in accept',
+                    'File "/usr/lib/python3.9/other_module.py", line 45, in other_function',
+                    'File "/usr/lib/python3.9/another_module.py", line 78, in another_function',
+                )
+            ),
             created_at=self.old_time,
         )
 
@@ -110,7 +117,7 @@ class TestFdInfoFactory:
         mock_time.return_value = self.current_time
         fd = Fd(
             subject="test_subject",
-            stack=self.test_stack,
+            stack_id=stack_table.intern(tuple(self.test_stack)),
             created_at=self.current_time - 61,  # Just over min_age
         )
 
@@ -179,3 +186,69 @@ class TestFdInfoFactory:
         # Assert
         # Empty string is in every string, so the first stack frame should be used
         assert result == self.test_stack[-1]
+
+    def test_get_deadline(self):
+        """Test that the deadline for an fd is its creation time plus min_age."""
+        # Act
+        result = self.factory.get_deadline(self.old_fd)
+
+        # Assert
+        assert result == self.old_time + 60
+
+    def test_get_identifier_with_exclude(self):
+        """Test that an Fd with any frame matching an exclude string has no identifier."""
+        # Arrange
+        factory = FdInfoFactory(
+            min_age=60,
+            identifier_include_any_of=["example"],
+            identifier_exclude_any_of=["pool", "socket.py"],
+        )
+
+        # Act
+        result = factory.get_identifier(self.old_fd)
+
+        # Assert
+        assert result is None
+        assert factory.create_fd_info(self.old_fd) is None
+
+    def test_get_identifier_escapes_patterns(self):
+        """Test that include strings are matched literally rather than as regular expressions."""
+        # Arrange
+        factory = FdInfoFactory(
+            min_age=60, identifier_include_any_of=["example_module.py"]
+        )
+        fd = Fd(
+            subject="test_subject",
+            stack_id=stack_table.intern(
+                ('File "/app/example_moduleXpy", line 1, in f',)
+            ),
+        )
+
+        # Act / Assert
+        assert factory.get_identifier(fd) is None
+        assert factory.get_identifier(self.old_fd) == self.test_stack[-1]
+
+    def test_get_identifier_memoized(self):
+        """Test that identifiers are matched once per stack."""
+        # Arrange
+        self.factory.get_identifier(self.old_fd)
+
+        # Act
+        with patch.object(FdInfoFactory, "_match") as mock_match:
+            result = self.factory.get_identifier(self.recent_fd)
+
+        # Assert
+        mock_match.assert_not_called()
+        assert result == self.test_stack[-1]
+
+    def test_get_identifier_after_patterns_changed(self):
+        """Test that changing the include strings discards memoized identifiers."""
+        # Arrange
+        self.factory.get_identifier(self.old_fd)
+
+        # Act
+        self.factory.identifier_include_any_of = ["test_module"]
+        result = self.factory.get_identifier(self.old_fd)
+
+        # Assert
+        assert result == self.test_stack[1]
@@ -1,14 +1,39 @@
 import builtins
+import gc
+import io
+import logging
+import math
+import os
 import socket
+import sys
 from tempfile import _io
 import threading
+import time
 from unittest.mock import patch, MagicMock
 
+import pytest
+
+from fdleaky.adaptive_sampler import AdaptiveSampler
+from fdleaky.event_ring import EventRing
 from fdleaky.fd import Fd
 from fdleaky.fd_info import FdInfo
 from fdleaky.fd_info_factory import FdInfoFactory
 from fdleaky.fd_info_store import FdInfoStore
-from fdleaky.fd_tracker import FdTracker, _get_subject
+from fdleaky.weak_fd_store import WeakFdStore
+from fdleaky.fd_tracker import (
+    FdTracker,
+    _get_subject,
+    _is_closed,
+    _raw_fd_key,
+    _snapshot,
+)
+from fdleaky.headroom_monitor import HeadroomMonitor
+from fdleaky.open_classifier import OpenClassifier
+from fdleaky.proc_fd_scanner import ProcFd, ProcFdScan, ProcFdScanner
+from fdleaky.sharded_dict import ShardedDict
+from fdleaky.site_stats import SiteStatsCollector
+from fdleaky.trend_detector import SiteTrend, TrendDetector
+from fdleaky.stack import is_internal_frame, stack_table
 
 
 class TestFdTracker:
@@ -19,6 +44,7 @@ class TestFdTracker:
         # Create mock objects
         self.mock_fd_info_factory = MagicMock(spec=FdInfoFactory)
         self.mock_long_term_store = MagicMock(spec=FdInfoStore)
+        self.mock_fd_info_factory.get_deadline.return_value = 0
 
         # Create the tracker with mocked dependencies
         self.tracker = FdTracker(
@@ -38,11 +64,10 @@ class TestFdTracker:
         """Clean up after each test method."""
         # Ensure tracker is closed
         if self.tracker.is_open:
-            # Set is_open to False to avoid hanging in _do_long_term_store
-            self.tracker.is_open = False
-            # Only join the worker if it exists
             if self.tracker._worker:
-                self.tracker._worker.join()
+                self.tracker.close()
+            else:
+                self.tracker.is_open = False
 
         # Restore original functions
         builtins.open = self.original_open
@@ -138,6 +163,71 @@ class TestFdTracker:
         assert self.tracker.is_open is False
         assert worker.is_alive() is False
 
+    def test_close_wakes_idle_worker(self):
+        """Test that closing the tracker does not wait for the worker to finish sleeping."""
+        # Arrange
+        self.tracker.sleep_interval = 60
+        self.tracker.start()
+
+        # Act
+        started = time.time()
+        self.tracker.close()
+
+        # Assert
+        assert time.time() - started < 5
+        assert self.tracker._worker.is_alive() is False
+
+    def test_worker_promotes_at_deadline(self):
+        """Test that the worker wakes for an fd queued after it went idle."""
+        # Arrange
+        promoted = threading.Event()
+        self.mock_fd_info_factory.get_deadline.side_effect = (
+            lambda fd: fd.created_at + 0.05
+        )
+        self.mock_fd_info_factory.create_fd_info.side_effect = lambda fd: promoted.set()
+        self.tracker.start()
+
+        # Act
+        self.tracker._store_fd(Fd(MagicMock(), stack_table.intern(("stack1",))))
+
+        # Assert
+        assert promoted.wait(5)
+
+    def test_worker_flushes_long_term_store(self):
+        """Test that the worker flushes the long term store when it goes idle and on close."""
+        # Arrange
+        flushed = threading.Event()
+        self.mock_long_term_store.flush.side_effect = lambda: flushed.set()
+        self.tracker.sleep_interval = 60
+        self.tracker.start()
+
+        # Act
+        idle_flush = flushed.wait(5)
+        self.mock_long_term_store.flush.reset_mock()
+        self.tracker.close()
+
+        # Assert
+        assert idle_flush
+        self.mock_long_term_store.flush.assert_called_once_with()
+
+    def test_close_promoted_fd_wakes_worker(self):
+        """Test that closing a file descriptor in long term storage wakes the worker to flush."""
+        # Arrange
+        self.tracker.sleep_interval = 60
+        self.tracker.start()
+        file_obj = MagicMock()
+        self.tracker._store_fd(Fd(file_obj, stack_table.intern(("stack1",))))
+        self.tracker._id_mapping[id(file_obj)] = "stored-id"
+        flushed = threading.Event()
+        self.mock_long_term_store.flush.side_effect = lambda: flushed.set()
+
+        # Act
+        self.tracker._close_fd(id(file_obj))
+
+        # Assert
+        self.mock_long_term_store.delete.assert_called_once_with("stored-id")
+        assert flushed.wait(5)
+
     def test_patched_open(self):
         """Test that open is patched correctly."""
         # Arrange - Create a tracker with mocked Thread
@@ -221,7 +311,9 @@ class TestFdTracker:
         self.tracker._original_close = mock_close
         sock = MagicMock()
         sock_id = id(sock)
-        self.tracker.short_term_store[sock_id] = Fd(sock, ["stack1", "stack2"])
+        self.tracker.short_term_store[sock_id] = Fd(
+            sock, stack_table.intern(("stack1", "stack2"))
+        )
 
         # Act
         with self.tracker:
@@ -239,7 +331,9 @@ class TestFdTracker:
         self.tracker._original_detach = mock_detach
         sock = MagicMock()
         sock_id = id(sock)
-        self.tracker.short_term_store[sock_id] = Fd(sock, ["stack1", "stack2"])
+        self.tracker.short_term_store[sock_id] = Fd(
+            sock, stack_table.intern(("stack1", "stack2"))
+        )
 
         # Act
         with self.tracker:
@@ -262,14 +356,140 @@ class TestFdTracker:
         assert fd_id == id(file_obj)
         assert fd_id in self.tracker.short_term_store
         assert self.tracker.short_term_store[fd_id].subject is file_obj
-        assert isinstance(self.tracker.short_term_store[fd_id].stack, list)
+        fd = self.tracker.short_term_store[fd_id]
+        assert isinstance(fd.stack_id, int)
+        assert "test_create_fd" in fd.stack[-2]
+
+    def test_create_fd_eager_stack(self):
+        """Test creating a file descriptor with lazy stack capture disabled."""
+        # Arrange
+        self.tracker.lazy_stack = False
+        file_obj = MagicMock()
+
+        # Act
+        fd_id = self.tracker._create_fd(file_obj)
+
+        # Assert
+        fd = self.tracker.short_term_store[fd_id]
+        assert all(
+            isinstance(frame, str) for frame in stack_table.get_frames(fd.stack_id)
+        )
+
+    def test_create_fd_expected(self):
+        """Test that file descriptors the classifier expects are neither captured nor stored."""
+        # Arrange
+        self.tracker.classifier = MagicMock(spec=OpenClassifier)
+        self.tracker.classifier.is_expected.return_value = True
+        file_obj = MagicMock()
+
+        # Act
+        with patch("fdleaky.fd_tracker.capture_stack_id") as mock_capture:
+            result = self.tracker._create_fd(file_obj)
+
+        # Assert
+        assert result == id(file_obj)
+        mock_capture.assert_not_called()
+        assert len(self.tracker.short_term_store) == 0
+        self.tracker.classifier.is_expected.assert_called_once_with(file_obj, __name__)
+
+    def test_create_fd_out_of_scope(self):
+        """Test that only file descriptors opened from included packages are tracked."""
+        # Arrange
+        self.tracker.include_packages = ["other_package"]
+        self.tracker._do_long_term_store = MagicMock()
+        self.tracker.start()
+
+        # Act
+        self.tracker._create_fd(MagicMock())
+        self.tracker.include_packages = ["tests"]
+        self.tracker.close()
+        self.tracker.start()
+        file_obj = MagicMock()
+        self.tracker._create_fd(file_obj)
+
+        # Assert
+        assert list(self.tracker.short_term_store) == [id(file_obj)]
+
+    def test_create_fd_trimmed(self):
+        """Test that fdleaky frames are removed from stacks when trim_stacks is set."""
+        # Arrange
+        self.tracker.trim_stacks = True
+        file_obj = MagicMock()
+
+        # Act
+        self.tracker._create_fd(file_obj)
+
+        # Assert
+        frames = stack_table.get_frames(
+            self.tracker.short_term_store[id(file_obj)].stack_id
+        )
+        assert frames[-1][0] is self.test_create_fd_trimmed.__code__
+        assert not any(is_internal_frame(frame) for frame in frames)
+
+    def test_site_stats(self):
+        """Test that opens and closes are counted by call site, with the lifetime on close."""
+        # Arrange
+        self.tracker.site_stats = SiteStatsCollector()
+        stack_id = stack_table.intern(("stack1",))
+        site_id = stack_table.get_site_id(stack_id)
+        subjects = [MagicMock(), MagicMock()]
+        for subject in subjects:
+            self.tracker._store_fd(Fd(subject, stack_id, created_at=time.time() - 1.5))
+
+        # Act
+        self.tracker._close_fd(id(subjects[0]))
+
+        # Assert
+        stats = self.tracker.site_stats.sites[site_id]
+        assert (stats.num_opened, stats.num_closed) == (2, 1)
+        assert stats.lifetimes[11] == 1  # 1.5s is in 1024ms up to 2048ms
+
+    def test_site_stats_for_reused_id(self):
+        """Test that an entry replaced by one with the same id is counted as closed."""
+        # Arrange
+        self.tracker.site_stats = SiteStatsCollector()
+        stack_id = stack_table.intern(("stack1",))
+        subject = MagicMock()
+
+        # Act
+        self.tracker._store_fd(Fd(subject, stack_id), 1)
+        self.tracker._store_fd(Fd(subject, stack_id), 1)
+        self.tracker._close_fd(1)
+
+        # Assert
+        stats = self.tracker.site_stats.sites[stack_table.get_site_id(stack_id)]
+        assert (stats.num_opened, stats.num_closed) == (2, 2)
+
+    def test_create_fd_sampled(self):
+        """Test that unsampled opens only record their call site."""
+        # Arrange
+        self.tracker.sampler = AdaptiveSampler()
+        ids = []
+        for index in range(4):
+            ids.append(self.tracker._create_fd(MagicMock()))
+            if index < 2:
+                self.tracker._close_fd(ids.pop())
+
+        # Assert - the first two opens were sampled, the third was not, and the fourth is a peak
+        unsampled = self.tracker.short_term_store[ids[0]]
+        frames = stack_table.get_frames(unsampled.stack_id)
+        assert len(frames) == 1
+        assert frames[0][0] is self.test_create_fd_sampled.__code__
+        sampled = self.tracker.short_term_store[ids[1]]
+        assert len(stack_table.get_frames(sampled.stack_id)) > 1
+        site_id = stack_table.get_site_id(sampled.stack_id)
+        assert site_id == unsampled.stack_id
+        state = self.tracker.sampler.sites[site_id]
+        assert (state.open_count, state.close_count) == (4, 2)
 
     def test_close_fd(self):
         """Test closing a file descriptor."""
         # Arrange
         file_obj = MagicMock()
         fd_id = id(file_obj)
-        self.tracker.short_term_store[fd_id] = Fd(file_obj, ["stack1", "stack2"])
+        self.tracker.short_term_store[fd_id] = Fd(
+            file_obj, stack_table.intern(("stack1", "stack2"))
+        )
         stored_id = "stored-id-123"
         self.tracker._id_mapping[fd_id] = stored_id
 
@@ -286,7 +506,9 @@ class TestFdTracker:
         # Arrange
         file_obj = MagicMock()
         fd_id = id(file_obj)
-        self.tracker.short_term_store[fd_id] = Fd(file_obj, ["stack1", "stack2"])
+        self.tracker.short_term_store[fd_id] = Fd(
+            file_obj, stack_table.intern(("stack1", "stack2"))
+        )
 
         # Act
         self.tracker._close_fd(fd_id)
@@ -300,7 +522,7 @@ class TestFdTracker:
         # Arrange
         file_obj = MagicMock()
         fd_id = id(file_obj)
-        fd = Fd(file_obj, ["stack1", "stack2"])
+        fd = Fd(file_obj, stack_table.intern(("stack1", "stack2")))
         self.tracker.short_term_store[fd_id] = fd
 
         mock_fd_info = MagicMock(spec=FdInfo)
@@ -321,7 +543,7 @@ class TestFdTracker:
         # Arrange
         file_obj = MagicMock()
         fd_id = id(file_obj)
-        fd = Fd(file_obj, ["stack1", "stack2"])
+        fd = Fd(file_obj, stack_table.intern(("stack1", "stack2")))
         self.tracker.short_term_store[fd_id] = fd
 
         self.mock_fd_info_factory.create_fd_info.return_value = None
@@ -340,16 +562,16 @@ class TestFdTracker:
         # Arrange
         file_obj = MagicMock()
         fd_id = id(file_obj)
-        fd = Fd(file_obj, ["stack1", "stack2"])
-        self.tracker.short_term_store[fd_id] = fd
+        fd = Fd(file_obj, stack_table.intern(("stack1", "stack2")))
+        self.tracker._store_fd(fd)
         self.tracker._id_mapping[fd_id] = "existing-id"
 
         # Override the loop so that the value only appears once.
         original_process_fd_for_long_term = self.tracker._process_fd_for_long_term
 
-        def override_process_fd_for_long_term(fd: Fd):
+        def override_process_fd_for_long_term(fd: Fd, id_: int):
             self.tracker.is_open = False
-            return original_process_fd_for_long_term(fd)
+            return original_process_fd_for_long_term(fd, id_)
 
         self.tracker._process_fd_for_long_term = override_process_fd_for_long_term
         self.tracker.is_open = True
@@ -360,6 +582,122 @@ class TestFdTracker:
         self.mock_long_term_store.create.assert_not_called()
         assert self.tracker._id_mapping[fd_id] == "existing-id"
 
+    def test_promote_due_only_processes_due_fds(self):
+        """Test that only fds whose deadline has passed are processed."""
+        # Arrange
+        self.mock_fd_info_factory.get_deadline.side_effect = lambda fd: fd.created_at
+        self.mock_fd_info_factory.create_fd_info.return_value = None
+        stack_id = stack_table.intern(("stack1", "stack2"))
+        due = Fd(MagicMock(), stack_id, created_at=10)
+        not_due = Fd(MagicMock(), stack_id, created_at=30)
+        self.tracker._store_fd(not_due)
+        self.tracker._store_fd(due)
+
+        # Act
+        self.tracker._promote_due(20)
+
+        # Assert
+        self.mock_fd_info_factory.create_fd_info.assert_called_once_with(due)
+        assert sorted(self.tracker._promotion_queue) == [
+            (20.01, id(due.subject)),
+            (30, id(not_due.subject)),
+        ]
+
+    def test_promote_due_rechecks_custom_factory(self):
+        """Test that a custom factory is asked again until it creates an FdInfo."""
+        # Arrange
+        fd = Fd(MagicMock(), stack_table.intern(("stack1", "stack2")), created_at=10)
+        self.tracker._store_fd(fd)
+        fd_info = MagicMock()
+        self.mock_fd_info_factory.create_fd_info.side_effect = [None, fd_info]
+
+        # Act
+        self.tracker._promote_due(20)
+        queued = list(self.tracker._promotion_queue)
+        self.tracker._promote_due(21)
+
+        # Assert
+        assert queued == [(20.01, id(fd.subject))]
+        self.mock_long_term_store.create.assert_called_once_with(fd_info)
+        assert not self.tracker._promotion_queue
+
+    def test_promote_due_default_factory_not_rechecked(self):
+        """Test that an fd the default factory rejects after its deadline is not asked again."""
+        # Arrange
+        self.tracker.fd_info_factory = FdInfoFactory(
+            min_age=0, identifier_exclude_any_of=["excluded"]
+        )
+        fd = Fd(MagicMock(), stack_table.intern(("excluded",)), created_at=10)
+        self.tracker._store_fd(fd)
+
+        # Act
+        self.tracker._promote_due(20)
+
+        # Assert
+        self.mock_long_term_store.create.assert_not_called()
+        assert not self.tracker._promotion_queue
+
+    def test_promote_due_skips_closed_fds(self):
+        """Test that closed fds are discarded from the promotion queue without processing."""
+        # Arrange
+        fd = Fd(MagicMock(), stack_table.intern(("stack1", "stack2")))
+        self.tracker._close_fd(self.tracker._store_fd(fd))
+
+        # Act
+        self.tracker._promote_due(fd.created_at)
+
+        # Assert
+        self.mock_fd_info_factory.create_fd_info.assert_not_called()
+        assert not self.tracker._promotion_queue
+
+    def test_promote_due_skips_reused_ids(self):
+        """Test that a newer fd reusing the id of a closed fd is not promoted early."""
+        # Arrange
+        self.mock_fd_info_factory.get_deadline.side_effect = lambda fd: fd.created_at
+        subject = MagicMock()
+        stack_id = stack_table.intern(("stack1", "stack2"))
+        self.tracker._close_fd(
+            self.tracker._store_fd(Fd(subject, stack_id, created_at=10))
+        )
+        newer = Fd(subject, stack_id, created_at=30)
+        self.tracker._store_fd(newer)
+
+        # Act
+        self.tracker._promote_due(20)
+
+        # Assert
+        self.mock_fd_info_factory.create_fd_info.assert_not_called()
+        assert self.tracker._promotion_queue == [(30, id(subject))]
+
+    def test_state_sharded_without_gil(self):
+        """Test that the short term store and id mapping are sharded on free threaded builds."""
+        # Act
+        with patch.object(sys, "_is_gil_enabled", lambda: False, create=True):
+            tracker = FdTracker()
+
+        # Assert
+        assert isinstance(tracker.short_term_store, ShardedDict)
+        assert isinstance(tracker._id_mapping, ShardedDict)
+
+    def test_worker_notified_for_earlier_deadline(self):
+        """Test that opens only notify the worker if it is waiting for a later deadline."""
+        # Arrange
+        self.mock_fd_info_factory.get_deadline.side_effect = lambda fd: fd.created_at
+        stack_id = stack_table.intern(("stack1", "stack2"))
+        self.tracker._condition = MagicMock()
+        self.tracker._wait_deadline = 20
+
+        # Act
+        self.tracker._store_fd(Fd(MagicMock(), stack_id, created_at=30))
+        notified_later = self.tracker._condition.notify.call_count
+        self.tracker._store_fd(Fd(MagicMock(), stack_id, created_at=10))
+
+        # Assert
+        assert notified_later == 0
+        self.tracker._condition.notify.assert_called_once()
+        assert len(self.tracker._new_promotions) == 2
+        assert not self.tracker._promotion_queue
+
     def test_get_subject_from_args(self):
         """Test getting the subject from args."""
         # Arrange
@@ -373,6 +711,16 @@ class TestFdTracker:
         # Assert
         assert result is subject
 
+    def test_snapshot(self):
+        """Test copying mappings with and without a snapshot method."""
+        # Arrange
+        sharded = ShardedDict()
+        sharded[1] = "one"
+
+        # Act / Assert
+        assert _snapshot({1: "one"}) == {1: "one"}
+        assert _snapshot(sharded) == {1: "one"}
+
     def test_get_subject_from_kwargs(self):
         """Test getting the subject from kwargs."""
         # Arrange
@@ -385,3 +733,812 @@ class TestFdTracker:
 
         # Assert
         assert result is subject
+
+
+class TestFdTrackerOsFds:
+    """Unit tests for tracking raw file descriptors."""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method."""
+        self.mock_fd_info_factory = MagicMock(spec=FdInfoFactory)
+        self.mock_fd_info_factory.get_deadline.return_value = 0
+        self.tracker = FdTracker(
+            fd_info_factory=self.mock_fd_info_factory,
+            long_term_store=MagicMock(spec=FdInfoStore),
+            track_os_fds=True,
+        )
+        self.mock_closerange = MagicMock()
+        self.tracker._original_os_functions["closerange"] = self.mock_closerange
+
+    def test_closerange_scans_store_for_large_ranges(self):
+        """Test that closing a range larger than the store only visits tracked fds."""
+        # Arrange
+        for fd in (3, 10, 20):
+            self.tracker._create_fd(fd, _raw_fd_key(fd))
+        subject = MagicMock()
+        self.tracker._create_fd(subject)
+
+        # Act
+        self.tracker._patched_os_closerange(5, 1_000_000)
+
+        # Assert
+        self.mock_closerange.assert_called_once_with(5, 1_000_000)
+        assert set(self.tracker.short_term_store) == {_raw_fd_key(3), id(subject)}
+
+    def test_closerange_small_range(self):
+        """Test closing a range smaller than the store."""
+        # Arrange
+        for fd in range(10):
+            self.tracker._create_fd(fd, _raw_fd_key(fd))
+
+        # Act
+        self.tracker._patched_os_closerange(2, 4)
+
+        # Assert
+        assert len(self.tracker.short_term_store) == 8
+        assert _raw_fd_key(2) not in self.tracker.short_term_store
+        assert _raw_fd_key(3) not in self.tracker.short_term_store
+
+    def test_transfer_raw_fd(self):
+        """Test that raw fds are only untracked when ownership is passed on."""
+        # Arrange
+        self.tracker._create_fd(3, _raw_fd_key(3))
+
+        # Act / Assert
+        self.tracker._transfer_raw_fd(3, (3, "r", -1, None, None, None, False))
+        assert _raw_fd_key(3) in self.tracker.short_term_store
+        self.tracker._transfer_raw_fd(3, (3,), {"closefd": False})
+        assert _raw_fd_key(3) in self.tracker.short_term_store
+        self.tracker._transfer_raw_fd("3")
+        assert _raw_fd_key(3) in self.tracker.short_term_store
+        self.tracker._transfer_raw_fd(3)
+        assert _raw_fd_key(3) not in self.tracker.short_term_store
+
+
+class TestFdTrackerEventRing:
+    """Unit tests for applying opens and closes from the event ring on the worker."""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method."""
+        self.mock_fd_info_factory = MagicMock(spec=FdInfoFactory)
+        self.mock_fd_info_factory.get_deadline.return_value = 0
+        self.tracker = FdTracker(
+            fd_info_factory=self.mock_fd_info_factory,
+            long_term_store=MagicMock(spec=FdInfoStore),
+            event_ring_size=4,
+        )
+        self.tracker._events = EventRing(4)
+        self.stack_id = stack_table.intern(("stack1",))
+
+    def test_events_applied_by_worker(self):
+        """Test that opens and closes only change the stores once events are applied."""
+        # Arrange
+        subjects = [MagicMock(), MagicMock()]
+        for subject in subjects:
+            self.tracker._store_fd(Fd(subject, self.stack_id))
+        self.tracker._close_fd(id(subjects[0]))
+
+        # Act
+        queued = len(self.tracker.short_term_store)
+        self.tracker._apply_events()
+
+        # Assert
+        assert queued == 0
+        assert list(self.tracker.short_term_store) == [id(subjects[1])]
+        assert self.tracker.num_dropped_events == 0
+
+    def test_open_and_close_in_batch_cancel(self):
+        """Test that an fd opened and closed in the same batch never reaches the stores."""
+        # Arrange
+        self.tracker.sampler = MagicMock(spec=AdaptiveSampler)
+        subject = MagicMock()
+        self.tracker._store_fd(Fd(subject, self.stack_id))
+        self.tracker._close_fd(id(subject))
+
+        # Act
+        self.tracker._apply_events()
+
+        # Assert
+        assert not self.tracker.short_term_store
+        assert not self.tracker._promotion_queue
+        self.tracker.sampler.on_close.assert_called_once_with(
+            stack_table.get_site_id(self.stack_id)
+        )
+
+    def test_site_stats_for_cancelled_events(self):
+        """Test that opens and closes cancelled within a batch are still counted."""
+        # Arrange
+        self.tracker.site_stats = SiteStatsCollector()
+        subject = MagicMock()
+        self.tracker._store_fd(
+            Fd(subject, self.stack_id, created_at=time.time() - 0.01)
+        )
+        self.tracker._close_fd(id(subject))
+        time.sleep(0.1)
+
+        # Act
+        self.tracker._apply_events()
+
+        # Assert
+        stats = self.tracker.site_stats.sites[stack_table.get_site_id(self.stack_id)]
+        assert (stats.num_opened, stats.num_closed) == (1, 1)
+        # The lifetime is measured when the close happened, rather than when it was applied
+        assert stats.lifetimes[4] == 1
+
+    def test_site_stats_for_reused_id(self):
+        """Test that an open replaced within a batch by one with the same id is counted closed."""
+        # Arrange
+        self.tracker.site_stats = SiteStatsCollector()
+        self.tracker._store_fd(Fd(MagicMock(), self.stack_id), 1)
+        self.tracker._apply_events()
+        self.tracker._store_fd(Fd(MagicMock(), self.stack_id), 1)
+        self.tracker._store_fd(Fd(MagicMock(), self.stack_id), 1)
+        self.tracker._close_fd(1)
+
+        # Act
+        self.tracker._apply_events()
+
+        # Assert
+        stats = self.tracker.site_stats.sites[stack_table.get_site_id(self.stack_id)]
+        assert stats.num_open == 0
+
+    def test_close_from_earlier_batch(self):
+        """Test that a close is applied to an fd opened in an earlier batch."""
+        # Arrange
+        subject = MagicMock()
+        self.tracker._store_fd(Fd(subject, self.stack_id))
+        self.tracker._apply_events()
+        self.tracker._close_fd(id(subject))
+
+        # Act
+        self.tracker._apply_events()
+
+        # Assert
+        assert not self.tracker.short_term_store
+        assert len(self.tracker._new_promotions) == 1
+
+    def test_overflow_applied(self):
+        """Test that a full ring is applied by the thread adding an event, in order."""
+        # Arrange
+        subjects = [MagicMock() for _ in range(4)]
+        for subject in subjects:
+            self.tracker._store_fd(Fd(subject, self.stack_id))
+
+        # Act
+        self.tracker._close_fd(id(subjects[0]))
+        applied = list(self.tracker.short_term_store)
+        self.tracker._apply_events()
+
+        # Assert
+        assert applied == [id(s) for s in subjects]
+        assert list(self.tracker.short_term_store) == [id(s) for s in subjects[1:]]
+        assert self.tracker.num_dropped_events == 0
+
+    def test_worker_woken_when_half_full(self):
+        """Test that a waiting worker is woken once the ring is half full."""
+        # Arrange
+        self.tracker._condition = MagicMock()
+        self.tracker._wait_deadline = math.inf
+        subjects = [MagicMock() for _ in range(3)]
+
+        # Act
+        for subject in subjects[:2]:
+            self.tracker._store_fd(Fd(subject, self.stack_id))
+        notified = self.tracker._condition.notify.call_count
+        self.tracker._store_fd(Fd(subjects[2], self.stack_id))
+
+        # Assert
+        assert notified == 0
+        self.tracker._condition.notify.assert_called_once()
+
+    def test_wait_timeout(self):
+        """Test that the worker wakes every event_ring_interval to apply events."""
+        # Arrange
+        self.tracker.event_ring_interval = 0.5
+        self.tracker._next_periodic = time.time() + 60
+
+        # Assert
+        assert self.tracker._get_wait_timeout() == 0.5
+
+    def test_open_and_close(self, tmp_path):
+        """Test tracking a file through the event ring with a running worker."""
+        # Arrange
+        self.tracker.event_ring_interval = 0.01
+        path = tmp_path / "file"
+
+        # Act
+        with self.tracker:
+            with open(path, "w", encoding="utf-8") as file:
+                for _ in range(500):
+                    if id(file) in self.tracker.short_term_store:
+                        break
+                    time.sleep(0.01)
+                tracked = id(file) in self.tracker.short_term_store
+            for _ in range(500):
+                if not self.tracker.short_term_store:
+                    break
+                time.sleep(0.01)
+
+        # Assert
+        assert tracked
+        assert not self.tracker.short_term_store
+
+
+class TestFdTrackerMaxEntries:
+    """Unit tests for tracking file descriptors in degraded mode beyond max_entries."""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method."""
+        self.mock_long_term_store = MagicMock(spec=FdInfoStore)
+        self.tracker = FdTracker(
+            fd_info_factory=FdInfoFactory(min_age=60),
+            long_term_store=self.mock_long_term_store,
+            max_entries=2,
+        )
+        self.stack_id = stack_table.intern(("site\n",))
+        self.subjects = [MagicMock() for _ in range(4)]
+        for subject in self.subjects:
+            self.tracker._store_fd(Fd(subject, self.stack_id, created_at=1000.0))
+
+    def test_entries_beyond_max_degraded(self):
+        """Test that file descriptors beyond max_entries only keep their site and open time."""
+        # Assert
+        assert list(self.tracker.short_term_store) == [id(s) for s in self.subjects[:2]]
+        assert self.tracker.is_degraded
+        assert self.tracker.get_degraded_sites() == {
+            stack_table.get_site_id(self.stack_id): (2, 1000.0)
+        }
+        assert len(self.tracker._new_promotions) == 2
+
+    def test_create_degraded_captures_site_only(self):
+        """Test that no full stack is captured for a file descriptor beyond max_entries."""
+        # Arrange
+        file_obj = MagicMock()
+
+        # Act
+        with patch("fdleaky.fd_tracker.capture_stack_id") as mock_capture:
+            self.tracker._create_fd(file_obj)
+
+        # Assert
+        mock_capture.assert_not_called()
+        site_ids = [
+            site_id
+            for site_id in self.tracker.get_degraded_sites()
+            if site_id != stack_table.get_site_id(self.stack_id)
+        ]
+        site = stack_table.get_frames(site_ids[0])[0]
+        assert site[0] is self.test_create_degraded_captures_site_only.__code__
+
+    def test_close_degraded(self):
+        """Test that closing degraded file descriptors keeps exact counts."""
+        # Act
+        self.tracker._close_fd(id(self.subjects[2]))
+        self.tracker._close_fd(id(self.subjects[0]))
+        degraded_sites = self.tracker.get_degraded_sites()
+        self.tracker._close_fd(id(self.subjects[3]))
+
+        # Assert
+        assert list(degraded_sites.values()) == [(1, 1000.0)]
+        assert not self.tracker.is_degraded
+
+    def test_reused_id_degraded(self):
+        """Test that a degraded entry replaced by one with the same id is counted as closed."""
+        # Arrange
+        self.tracker.site_stats = SiteStatsCollector()
+        subject = MagicMock()
+        self.tracker._store_fd(Fd(subject, self.stack_id), 1)
+        self.tracker._store_fd(Fd(subject, self.stack_id), 1)
+
+        # Act
+        self.tracker._close_fd(1)
+
+        # Assert
+        stats = self.tracker.site_stats.sites[stack_table.get_site_id(self.stack_id)]
+        assert stats.num_open == 0
+        assert len(self.tracker.get_degraded_sites()) == 1
+
+    def test_report_degraded(self, caplog):
+        """Test that degraded mode is logged and counts by site are stored."""
+        # Act
+        with caplog.at_level(logging.INFO):
+            self.tracker._report_degraded()
+            self.tracker._report_degraded()
+            fd_info = self.mock_long_term_store.create.call_args[0][0]
+            self.tracker._close_fd(id(self.subjects[2]))
+            self.tracker._report_degraded()
+            self.tracker._close_fd(id(self.subjects[3]))
+            self.tracker._report_degraded()
+
+        # Assert
+        assert fd_info.identifier == "2 file descriptors without stacks opened at: site"
+        assert [
+            c[0][0].identifier for c in self.mock_long_term_store.create.call_args_list
+        ] == [
+            "2 file descriptors without stacks opened at: site",
+            "1 file descriptors without stacks opened at: site",
+        ]
+        assert self.mock_long_term_store.delete.call_count == 2
+        assert [r.levelname for r in caplog.records] == ["WARNING", "INFO"]
+        assert not self.tracker._has_periodic_tasks
+
+
+class TestFdTrackerTrends:
+    """Unit tests for reporting call sites whose open file descriptors keep growing."""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method."""
+        self.mock_long_term_store = MagicMock(spec=FdInfoStore)
+        self.mock_detector = MagicMock(spec=TrendDetector)
+        self.tracker = FdTracker(
+            long_term_store=self.mock_long_term_store,
+            site_stats=SiteStatsCollector(),
+            trend_detector=self.mock_detector,
+        )
+        self.site_id = stack_table.intern(("site\n",))
+        self.mock_detector.trends = {self.site_id: SiteTrend(5, 0, slope=0.5)}
+
+    def test_site_stats_created(self):
+        """Test that site stats are collected if a trend detector is given."""
+        # Arrange
+        tracker = FdTracker(trend_detector=TrendDetector())
+        tracker._do_long_term_store = MagicMock()
+
+        # Act
+        with tracker:
+            pass
+
+        # Assert
+        assert isinstance(tracker.site_stats, SiteStatsCollector)
+
+    def test_report_trends(self, caplog):
+        """Test that growing sites are logged and stored until they stop growing."""
+        # Arrange
+        self.mock_detector.sample.side_effect = [{self.site_id}, {self.site_id}, set()]
+
+        # Act
+        self.tracker._report_trends()
+        self.tracker._report_trends()
+        fd_info = self.mock_long_term_store.create.call_args[0][0]
+        self.tracker._report_trends()
+
+        # Assert
+        self.mock_long_term_store.create.assert_called_once()
+        assert fd_info.identifier == "Open file descriptors growing at: site"
+        self.mock_long_term_store.delete.assert_called_once_with(fd_info.id)
+        assert "growing by 30.00 per minute (5 open)" in caplog.text
+        assert self.tracker._has_periodic_tasks
+
+
+class TestFdTrackerHeadroom:
+    """Unit tests for reporting the call sites with most open file descriptors near the limit."""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method."""
+        self.mock_long_term_store = MagicMock(spec=FdInfoStore)
+        self.monitor = HeadroomMonitor(
+            watermarks=[0.5, 0.8], top_n=1, path="/missing", limit=10
+        )
+        self.tracker = FdTracker(
+            fd_info_factory=FdInfoFactory(min_age=60),
+            long_term_store=self.mock_long_term_store,
+            headroom_monitor=self.monitor,
+        )
+        self.monitor.read_limit()
+        self.tracker._check_headroom()
+        self.stack_ids = [stack_table.intern((f"site{i}\n",)) for i in range(2)]
+        self.subjects = []
+
+    def _open(self, num_fds: int, stack_id: int):
+        for _ in range(num_fds):
+            subject = MagicMock()
+            self.subjects.append(subject)
+            self.tracker._store_fd(Fd(subject, stack_id))
+
+    def test_worker_woken_at_watermark(self):
+        """Test that the worker is only asked to check when the next watermark is reached."""
+        # Act
+        self._open(4, self.stack_ids[0])
+        due_before = self.tracker._headroom_due
+        self._open(1, self.stack_ids[0])
+
+        # Assert
+        assert not due_before
+        assert self.tracker._headroom_due
+        assert self.tracker._headroom_threshold == math.inf
+
+    def test_report_at_watermark(self, caplog):
+        """Test that crossing a watermark logs and stores the top call sites, until it is left."""
+        # Arrange
+        self._open(2, self.stack_ids[0])
+        self._open(3, self.stack_ids[1])
+
+        # Act
+        self.tracker._check_headroom()
+        self.tracker._check_headroom()
+        fd_info = self.mock_long_term_store.create.call_args[0][0]
+        self.tracker._close_fd(id(self.subjects[0]))
+        self.tracker._check_headroom()
+
+        # Assert
+        self.mock_long_term_store.create.assert_called_once()
+        assert fd_info.identifier == (
+            "5 of 10 file descriptors open (Over 50% of RLIMIT_NOFILE)"
+        )
+        assert fd_info.stack == ["3 open at: site1"]
+        self.mock_long_term_store.delete.assert_called_once_with(fd_info.id)
+        assert "5 of 10 file descriptors are open" in caplog.text
+        assert self.tracker._headroom_threshold == 5
+
+    def test_unlimited(self):
+        """Test that the monitor is discarded if there is no limit."""
+        # Arrange
+        tracker = FdTracker(headroom_monitor=HeadroomMonitor())
+        tracker._do_long_term_store = MagicMock()
+
+        # Act
+        with patch("resource.getrlimit", return_value=(-1, -1)), patch(
+            "resource.RLIM_INFINITY", -1
+        ):
+            with tracker:
+                pass
+
+        # Assert
+        assert tracker.headroom_monitor is None
+
+
+class TestFdTrackerDump:
+    """Unit tests for dumping the file descriptors tracked by call site."""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method."""
+        self.dump_file = io.StringIO()
+        self.tracker = FdTracker(
+            long_term_store=MagicMock(spec=FdInfoStore),
+            max_entries=3,
+            dump_file=self.dump_file,
+        )
+        self.stack_ids = [stack_table.intern((f"site{i}\n",)) for i in range(2)]
+        self.subjects = [MagicMock() for _ in range(4)]
+        now = time.time()
+        for subject, stack_id, age in zip(
+            self.subjects, [0, 1, 1, 1], [10, 30, 20, 40]
+        ):
+            self.tracker._store_fd(
+                Fd(subject, self.stack_ids[stack_id], created_at=now - age)
+            )
+
+    def test_get_open_sites(self):
+        """Test that counts and the oldest open time include degraded file descriptors."""
+        # Act
+        sites = self.tracker.get_open_sites()
+
+        # Assert
+        assert {site_id: num_fds for site_id, (num_fds, _) in sites.items()} == {
+            self.stack_ids[0]: 1,
+            self.stack_ids[1]: 3,
+        }
+        assert time.time() - sites[self.stack_ids[1]][1] >= 40
+
+    def test_snapshot(self):
+        """Test that a snapshot reads the counters of site stats, not the short term store."""
+        # Arrange
+        self.tracker.site_stats = SiteStatsCollector()
+        subject = MagicMock()
+        self.tracker._store_fd(Fd(subject, self.stack_ids[0]))
+        self.tracker._store_fd(Fd(MagicMock(), self.stack_ids[1]))
+        before = self.tracker.snapshot()
+        self.tracker._close_fd(id(subject))
+        self.tracker._store_fd(Fd(MagicMock(), self.stack_ids[1]))
+        self.tracker.short_term_store = MagicMock()
+
+        # Act
+        after = self.tracker.snapshot()
+
+        # Assert
+        assert dict(before.sites) == {self.stack_ids[0]: 1, self.stack_ids[1]: 1}
+        assert [(d.site, d.delta) for d in after.compare_to(before)] == [("site1", 1)]
+        assert not self.tracker.short_term_store.mock_calls
+
+    def test_snapshot_requires_site_stats(self):
+        """Test that a snapshot is not built by copying the short term store."""
+        with pytest.raises(ValueError):
+            self.tracker.snapshot()
+
+    def test_dump_open_sites(self):
+        """Test that a dump lists call sites by number open, without examining subjects."""
+        # Act
+        self.tracker.request_dump()
+        requested = self.tracker._dump_requested
+        self.tracker._dump_open_sites()
+
+        # Assert
+        assert requested
+        assert not self.tracker._dump_requested
+        lines = self.dump_file.getvalue().splitlines()
+        assert lines[0] == "fdleaky: 4 file descriptors open at 2 call sites"
+        assert lines[1].startswith("  3 open (Oldest 40.")
+        assert lines[1].endswith(") at: site1")
+        assert lines[2].endswith(") at: site0")
+        for subject in self.subjects:
+            subject.fileno.assert_not_called()
+
+    def test_dump_from_worker(self):
+        """Test that the worker writes a dump promptly when requested."""
+        # Act
+        with self.tracker:
+            self.tracker.request_dump()
+            for _ in range(100):
+                if self.dump_file.getvalue():
+                    break
+                time.sleep(0.01)
+
+        # Assert
+        assert "4 file descriptors open" in self.dump_file.getvalue()
+
+
+class TestFdTrackerProcFdScanner:
+    """Unit tests for reconciling tracked file descriptors with /proc/self/fd."""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method."""
+        self.mock_long_term_store = MagicMock(spec=FdInfoStore)
+        self.mock_scanner = MagicMock(spec=ProcFdScanner)
+        self.tracker = FdTracker(
+            fd_info_factory=FdInfoFactory(min_age=60),
+            long_term_store=self.mock_long_term_store,
+            proc_fd_scanner=self.mock_scanner,
+        )
+
+    def test_get_tracked_fds(self):
+        """Test mapping file descriptor numbers to keys in the short term store."""
+        # Arrange
+        stack_id = stack_table.intern(("stack1",))
+        sock = MagicMock()
+        sock.fileno.return_value = 7
+        closed = MagicMock()
+        closed.fileno.side_effect = ValueError()
+        self.tracker._store_fd(Fd(sock, stack_id))
+        self.tracker._store_fd(Fd(closed, stack_id))
+        self.tracker._store_fd(Fd(3, stack_id), _raw_fd_key(3))
+
+        # Act
+        result = self.tracker._get_tracked_fds()
+
+        # Assert
+        assert result == {7: id(sock), 3: _raw_fd_key(3)}
+
+    def test_scan_discards_stale(self):
+        """Test that tracked file descriptors which are no longer open are discarded."""
+        # Arrange
+        self.tracker._store_fd(Fd(3, stack_table.intern(("stack1",))), _raw_fd_key(3))
+        self.mock_scanner.scan.return_value = ProcFdScan(untracked=[], stale=[3])
+
+        # Act
+        self.tracker._scan_proc_fds()
+
+        # Assert
+        self.mock_scanner.scan.assert_called_once_with({3})
+        assert len(self.tracker.short_term_store) == 0
+
+    def test_scan_stores_old_untracked(self):
+        """Test that untracked file descriptors are stored once older than min_age."""
+        # Arrange
+        old = ProcFd(5, "socket:[1]", time.time() - 120)
+        recent = ProcFd(6, "socket:[2]", time.time())
+        self.mock_scanner.scan.return_value = ProcFdScan(
+            untracked=[old, recent], stale=[]
+        )
+
+        # Act
+        self.tracker._scan_proc_fds()
+        self.tracker._scan_proc_fds()
+
+        # Assert
+        self.mock_long_term_store.create.assert_called_once()
+        fd_info = self.mock_long_term_store.create.call_args[0][0]
+        assert fd_info.identifier == "Untracked file descriptor 5: socket:[1]"
+
+        # Act - the file descriptor is closed
+        self.mock_scanner.scan.return_value = ProcFdScan(untracked=[recent], stale=[])
+        self.tracker._scan_proc_fds()
+
+        # Assert
+        self.mock_long_term_store.delete.assert_called_once_with(fd_info.id)
+        assert not self.tracker._untracked_mapping
+
+    def test_get_tracked_fds_degraded(self):
+        """Test that degraded integer file descriptors are tracked, and degraded subjects ignored."""
+        # Arrange
+        self.tracker.max_entries = 0
+        stack_id = stack_table.intern(("stack1",))
+        sock = MagicMock()
+        self.tracker._store_fd(Fd(3, stack_id), _raw_fd_key(3))
+        self.tracker._store_fd(Fd(sock, stack_id))
+
+        # Act
+        result = self.tracker._get_tracked_fds()
+
+        # Assert
+        assert result == {3: _raw_fd_key(3)}
+        self.mock_scanner.ignore.assert_called_with(sock)
+
+    def test_skipped_fds_ignored(self):
+        """Test that file descriptors skipped by the classifier are ignored by the scanner."""
+        # Arrange
+        self.tracker.classifier = MagicMock(spec=OpenClassifier)
+        self.tracker.classifier.is_expected.return_value = True
+        file_obj = MagicMock()
+
+        # Act
+        self.tracker._create_fd(file_obj)
+
+        # Assert
+        self.mock_scanner.ignore.assert_called_once_with(file_obj)
+
+    @pytest.mark.skipif(
+        not os.path.isdir("/proc/self/fd"), reason="/proc is not available"
+    )
+    def test_fds_open_at_start_ignored(self):
+        """Test that file descriptors open before tracking started are not untracked."""
+        # Arrange
+        self.tracker.proc_fd_scanner = ProcFdScanner()
+        self.tracker._do_long_term_store = MagicMock()
+
+        # Act
+        with self.tracker:
+            result = self.tracker.proc_fd_scanner.scan(
+                set(self.tracker._get_tracked_fds())
+            )
+
+        # Assert
+        assert not result.untracked
+        assert {0, 1, 2} <= self.tracker.proc_fd_scanner.ignored
+
+    def test_unavailable_scanner_disabled(self):
+        """Test that the scanner is not used if /proc is not available."""
+        # Arrange
+        self.mock_scanner.is_available.return_value = False
+        self.tracker._do_long_term_store = MagicMock()
+
+        # Act
+        with self.tracker:
+            pass
+
+        # Assert
+        assert self.tracker.proc_fd_scanner is None
+
+
+class TestFdTrackerFinalizers:
+    """Unit tests for close detection using finalizers."""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method."""
+        # A mock factory would keep subjects alive through its recorded calls
+        self.mock_long_term_store = MagicMock(spec=FdInfoStore)
+        self.tracker = FdTracker(
+            fd_info_factory=FdInfoFactory(min_age=0),
+            long_term_store=self.mock_long_term_store,
+            short_term_store=WeakFdStore(),
+            use_finalizers=True,
+        )
+        self.tracker._original_open = builtins.open
+
+    def test_strong_store_replaced(self, tmp_path):
+        """Test that a dict short term store is replaced so closed files are not kept alive."""
+        # Arrange
+        tracker = FdTracker(
+            long_term_store=self.mock_long_term_store, use_finalizers=True
+        )
+        tracker._do_long_term_store = MagicMock()
+
+        # Act
+        with tracker:
+            for _ in range(100):
+                with open(tmp_path / "test.txt", "w", encoding="utf-8"):
+                    pass
+            gc.collect()
+            num_tracked = len(tracker.short_term_store)
+
+        # Assert
+        assert isinstance(tracker.short_term_store, WeakFdStore)
+        assert num_tracked == 0
+
+    def test_collected_subject_not_promoted(self, tmp_path):
+        """Test that a weakly stored subject collected without finalizers is not a leak."""
+        # Arrange
+        self.tracker.use_finalizers = False
+        file_obj = open(tmp_path / "test.txt", "w", encoding="utf-8")
+        id_ = self.tracker._create_fd(file_obj)
+
+        # Act
+        file_obj.close()
+        del file_obj
+        gc.collect()
+        self.tracker._promote_due(time.time() + 1)
+
+        # Assert
+        assert id_ not in self.tracker.short_term_store
+        self.mock_long_term_store.create.assert_not_called()
+
+    def test_open_does_not_patch_close(self, tmp_path):
+        """Test that file objects keep their own close method."""
+        # Act
+        file_obj = self.tracker._patched_open(tmp_path / "test.txt", "w")
+
+        # Assert
+        assert "close" not in vars(file_obj)
+        assert len(self.tracker.short_term_store) == 1
+        file_obj.close()
+
+    def test_garbage_collected_file_removed(self, tmp_path):
+        """Test that a file which is garbage collected without being closed is removed."""
+        # Arrange
+        file_obj = self.tracker._patched_open(tmp_path / "test.txt", "w")
+        self.tracker._id_mapping[id(file_obj)] = "stored-id"
+
+        # Act
+        del file_obj
+        gc.collect()
+
+        # Assert
+        assert len(self.tracker.short_term_store) == 0
+        self.mock_long_term_store.delete.assert_called_once_with("stored-id")
+
+    def test_closed_file_not_promoted(self, tmp_path):
+        """Test that a file closed without the tracker being notified is not promoted."""
+        # Arrange
+        with self.tracker._patched_open(tmp_path / "test.txt", "w") as file_obj:
+            pass
+
+        # Act
+        self.tracker._promote_due(time.time())
+
+        # Assert
+        self.mock_long_term_store.create.assert_not_called()
+        assert id(file_obj) not in self.tracker.short_term_store
+
+    def test_sweep_closed(self, tmp_path):
+        """Test that promoted files which have since been closed or detached are removed."""
+        # Arrange
+        closed = self.tracker._patched_open(tmp_path / "closed.txt", "w")
+        detached = self.tracker._patched_open(tmp_path / "detached.txt", "w")
+        still_open = self.tracker._patched_open(tmp_path / "open.txt", "w")
+        for index, file_obj in enumerate((closed, detached, still_open)):
+            self.tracker._id_mapping[id(file_obj)] = f"stored-{index}"
+        closed.close()
+        buffer = detached.detach()
+
+        # Act
+        self.tracker._sweep_closed()
+
+        # Assert
+        assert list(self.tracker._id_mapping.values()) == ["stored-2"]
+        assert self.mock_long_term_store.delete.call_count == 2
+        buffer.close()
+        still_open.close()
+
+    def test_wait_timeout(self):
+        """Test that the worker wakes to sweep promoted fds every sleep_interval."""
+        # Arrange
+        self.tracker.sleep_interval = 5
+
+        self.tracker._next_periodic = time.time() + 5
+
+        # Act / Assert
+        assert self.tracker._get_wait_timeout() is None
+        self.tracker._id_mapping[1] = "stored-id"
+        assert 4 < self.tracker._get_wait_timeout() <= 5
+        self.tracker._promotion_queue.append((time.time() + 1, 1))
+        assert self.tracker._get_wait_timeout() <= 1
+
+    def test_is_closed(self):
+        """Test determining whether subjects are closed."""
+        # Arrange
+        sock = socket.socket()
+        sock.close()
+
+        # Act / Assert
+        assert _is_closed(None) is True
+        assert _is_closed(sock) is True
+        assert _is_closed(MagicMock()) is False
+        assert _is_closed(3) is False
@@ -1,6 +1,11 @@
 import os
 import random
+import select
+import selectors
+import socket
 import socketserver
+import subprocess
+import sys
 from tempfile import NamedTemporaryFile
 from threading import Thread
 import time
@@ -76,3 +81,71 @@ def test_http():
                 httpd.shutdown()
                 thread.join()
             assert len(tracker.short_term_store) == 0
+
+
+def _raw_fds(tracker):
+    return {-1 - key for key in tracker.short_term_store if key < 0}
+
+
+def test_os_fds(tmp_path):
+    original_os_open = os.open
+    with FdTracker(sleep_interval=0.1, track_os_fds=True) as tracker:
+        read_fd, write_fd = os.pipe()
+        file_fd = os.open(tmp_path / "file", os.O_CREAT | os.O_WRONLY)
+        dup_fd = os.dup(file_fd)
+        assert _raw_fds(tracker) == {read_fd, write_fd, file_fd, dup_fd}
+        fd = tracker.short_term_store[-1 - file_fd]
+        assert fd.subject == file_fd
+        assert any("test_os_fds" in frame for frame in fd.stack)
+        os.close(read_fd)
+        os.close(write_fd)
+        os.closerange(dup_fd, dup_fd + 1)
+        assert _raw_fds(tracker) == {file_fd}
+        os.dup2(file_fd, write_fd)
+        assert _raw_fds(tracker) == {file_fd, write_fd}
+        os.close(write_fd)
+        os.close(file_fd)
+        assert len(tracker.short_term_store) == 0
+    assert os.open is original_os_open
+
+
+def test_fdopen_transfers_ownership():
+    with FdTracker(sleep_interval=0.1, track_os_fds=True) as tracker:
+        read_fd, write_fd = os.pipe()
+        with os.fdopen(write_fd, "w") as writer:
+            assert _raw_fds(tracker) == {read_fd}
+            assert id(writer) in tracker.short_term_store
+        os.close(read_fd)
+        assert len(tracker.short_term_store) == 0
+
+
+def test_subprocess_pipes():
+    with FdTracker(sleep_interval=0.1, track_os_fds=True) as tracker:
+        result = subprocess.run(
+            [sys.executable, "-c", "print('tested')"], capture_output=True, check=True
+        )
+        assert result.stdout.strip() == b"tested"
+        assert len(tracker.short_term_store) == 0
+
+
+def test_socketpair():
+    with FdTracker(sleep_interval=0.1, track_os_fds=True) as tracker:
+        first, second = socket.socketpair()
+        assert {id(first), id(second)} <= set(tracker.short_term_store)
+        assert not _raw_fds(tracker)
+        first.close()
+        second.close()
+        assert len(tracker.short_term_store) == 0
+
+
+@pytest.mark.skipif(not hasattr(select, "epoll"), reason="epoll is not available")
+def test_epoll():
+    with FdTracker(sleep_interval=0.1, track_os_fds=True) as tracker:
+        with selectors.EpollSelector() as selector:
+            epoll = selector._selector
+            assert id(epoll) in tracker.short_term_store
+        assert epoll.closed
+        tracker._sweep_closed()
+        tracker._promote_due(time.time() + 3600)
+        assert len(tracker.short_term_store) == 0
+    assert selectors.EpollSelector._selector_cls is select.epoll
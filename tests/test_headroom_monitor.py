@@ -0,0 +1,98 @@
+import math
+from unittest.mock import patch
+
+import pytest
+
+from fdleaky.headroom_monitor import HeadroomMonitor
+
+
+class TestHeadroomMonitor:
+    """Unit tests for the HeadroomMonitor class, using a directory of files in place of /proc."""
+
+    @pytest.fixture(autouse=True)
+    def setup_dir(self, tmp_path):
+        """Set up a directory of entries resembling /proc/self/fd."""
+        self.dir = tmp_path / "fd"
+        self.dir.mkdir()
+        self.monitor = HeadroomMonitor(
+            watermarks=[0.9, 0.5], path=str(self.dir), limit=100
+        )
+        self.monitor.read_limit()
+        self._add_entries(11)  # Including the one used to list the directory
+
+    def _add_entries(self, num_entries: int):
+        start = len(list(self.dir.iterdir()))
+        for fd in range(start, start + num_entries):
+            (self.dir / str(fd)).touch()
+
+    def test_read_limit(self):
+        """Test that the soft RLIMIT_NOFILE limit is read unless a limit is given."""
+        # Arrange
+        monitor = HeadroomMonitor()
+
+        # Act
+        with patch("resource.getrlimit", return_value=(1024, 4096)):
+            limit = monitor.read_limit()
+
+        # Assert
+        assert limit == 1024
+        assert self.monitor.limit == 100
+
+    def test_read_unlimited(self):
+        """Test that no limit is read if the number of open file descriptors is unlimited."""
+        # Arrange
+        monitor = HeadroomMonitor()
+
+        # Act
+        with patch("resource.getrlimit", return_value=(-1, -1)), patch(
+            "resource.RLIM_INFINITY", -1
+        ):
+            limit = monitor.read_limit()
+
+        # Assert
+        assert limit is None
+
+    def test_count(self):
+        """Test that file descriptors are counted, and the number untracked remembered."""
+        # Act
+        num_open = self.monitor.count(lambda: 4)
+
+        # Assert
+        assert num_open == 10
+        assert self.monitor.num_untracked == 6
+        assert self.monitor.get_threshold() == 44
+
+    def test_count_opened_while_listing(self):
+        """Test that descriptors tracked while listing are not counted as untracked."""
+        # Arrange
+        num_tracked = iter([4, 7])
+
+        # Act
+        num_open = self.monitor.count(lambda: next(num_tracked))
+
+        # Assert
+        assert num_open == 10
+        assert self.monitor.num_untracked == 3
+
+    def test_count_unavailable(self):
+        """Test that the number untracked is assumed unchanged if the directory is missing."""
+        # Arrange
+        self.monitor.count(lambda: 4)
+        self.monitor.path = str(self.dir / "missing")
+
+        # Act
+        num_open = self.monitor.count(lambda: 20)
+
+        # Assert
+        assert num_open == 26
+
+    def test_levels(self):
+        """Test the watermarks which the number of open file descriptors is at or over."""
+        # Act
+        levels = [self.monitor.get_level(n) for n in (49, 50, 89, 90, 100)]
+        self.monitor.level = 2
+
+        # Assert
+        assert levels == [0, 1, 1, 2, 2]
+        assert self.monitor.get_watermark(1) == 0.5
+        assert self.monitor.get_threshold() == math.inf
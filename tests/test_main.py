@@ -1,4 +1,6 @@
 import sys
+from unittest.mock import patch
+
 import pytest
 from fdleaky.__main__ import main
 
@@ -10,7 +12,9 @@ def test_main_no_args(capsys):
         main()
     assert exc_info.value.code == 1
     captured = capsys.readouterr()
-    assert "Usage: python -m fdleaky module_to_run [args...]" in captured.err
+    assert (
+        "Usage: python -m fdleaky [--keypress] module_to_run [args...]" in captured.err
+    )
 
 
 def test_main_with_nonexistent_module(capsys):
@@ -43,3 +47,30 @@ def test_main_with_nonexistent_file(capsys):
     assert exc_info.value.code == 1
     captured = capsys.readouterr()
     assert "Error: File nonexistent.py not found" in captured.err
+
+
+def test_main_report(tmp_path, capsys):
+    """Test main with the report subcommand"""
+    sys.argv = ["fdleaky", "report", str(tmp_path), "--workers", "1"]
+    main()
+    captured = capsys.readouterr()
+    assert "0 records in 0 groups" in captured.out
+
+
+def test_main_keypress_opt_in(tmp_path, capsys):
+    """Test that keypresses are only read when requested"""
+    test_file = tmp_path / "test_script.py"
+    test_file.write_text("print('Hello from test script')")
+
+    with patch("fdleaky.__main__.FdTracker"), patch(
+        "fdleaky.__main__.install_signal_handler"
+    ), patch("fdleaky.__main__.start_keypress_listener") as mock_listener:
+        sys.argv = ["fdleaky", str(test_file)]
+        main()
+        not_requested = mock_listener.call_count
+        sys.argv = ["fdleaky", "--keypress", str(test_file)]
+        main()
+
+    assert not_requested == 0
+    mock_listener.assert_called_once()
+    assert capsys.readouterr().out.count("Hello from test script") == 2
@@ -0,0 +1,72 @@
+import socket
+from unittest.mock import MagicMock
+
+from fdleaky.open_classifier import OpenClassifier
+
+
+class TestOpenClassifier:
+    """Unit tests for the OpenClassifier class."""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method."""
+        self.classifier = OpenClassifier(
+            expected_socket_kinds=[(socket.AF_UNIX, None), (None, socket.SOCK_DGRAM)],
+            expected_path_prefixes=["/usr/lib/"],
+            expected_modes=["rb"],
+            expected_modules=["sqlalchemy.pool"],
+        )
+
+    def _file(self, name, mode: str = "w") -> MagicMock:
+        file_obj = MagicMock(spec=["name", "mode"])
+        file_obj.name = name
+        file_obj.mode = mode
+        return file_obj
+
+    def test_socket_kinds(self):
+        """Test matching sockets by family and type, where None matches anything."""
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            assert self.classifier.classify(sock, "app")
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            assert self.classifier.classify(sock, "app")
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            assert not self.classifier.classify(sock, "app")
+
+    def test_socket_kind_given(self):
+        """Test that a socket kind given is used, ignoring flags combined with the type."""
+        # Arrange
+        sock = MagicMock(spec=socket.socket)
+        flags = getattr(socket, "SOCK_CLOEXEC", 0)
+
+        # Act / Assert
+        assert self.classifier.classify(
+            sock, "app", (socket.AF_INET, socket.SOCK_DGRAM | flags)
+        )
+        assert not self.classifier.classify(
+            sock, "app", (socket.AF_INET, socket.SOCK_STREAM)
+        )
+
+    def test_files(self):
+        """Test matching files by path prefix and mode."""
+        assert self.classifier.classify(self._file("/usr/lib/python3/x.py"), "app")
+        assert self.classifier.classify(self._file("/tmp/x", "rb"), "app")
+        assert not self.classifier.classify(self._file("/tmp/x"), "app")
+        assert not self.classifier.classify(self._file(3), "app")
+
+    def test_modules(self):
+        """Test matching the calling module, including submodules."""
+        file_obj = self._file("/tmp/x")
+        assert self.classifier.classify(file_obj, "sqlalchemy.pool")
+        assert self.classifier.classify(file_obj, "sqlalchemy.pool.impl")
+        assert not self.classifier.classify(file_obj, "sqlalchemy.pooling")
+        assert not self.classifier.classify(file_obj, "sqlalchemy")
+
+    def test_is_expected_counts_by_module(self):
+        """Test that expected opens are counted by module."""
+        # Act
+        self.classifier.is_expected(self._file("/tmp/x", "rb"), "app.cache")
+        self.classifier.is_expected(self._file("/tmp/x", "rb"), "app.cache")
+        result = self.classifier.is_expected(self._file("/tmp/x"), "app.cache")
+
+        # Assert
+        assert not result
+        assert self.classifier.expected_counts == {"app.cache": 2}
@@ -0,0 +1,136 @@
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from fdleaky.proc_fd_scanner import ProcFdScanner
+
+
+class TestProcFdScanner:
+    """Unit tests for the ProcFdScanner class, using a directory of links in place of /proc."""
+
+    @pytest.fixture(autouse=True)
+    def setup_dir(self, tmp_path):
+        """Set up a directory of links resembling /proc/self/fd."""
+        self.dir = tmp_path / "fd"
+        self.dir.mkdir()
+        self.scanner = ProcFdScanner(path=str(self.dir))
+        self._link(3, "/tmp/tracked")
+        self._link(4, "socket:[1234]")
+
+    def _link(self, fd: int, target: str):
+        os.symlink(target, self.dir / str(fd))
+
+    def test_is_available(self, tmp_path):
+        """Test that the scanner is only available if the directory exists."""
+        assert self.scanner.is_available()
+        assert not ProcFdScanner(path=str(tmp_path / "missing")).is_available()
+
+    def test_scan(self):
+        """Test that untracked and stale file descriptors are reported."""
+        # Act
+        result = self.scanner.scan({3, 5})
+
+        # Assert
+        assert [(p.fd, p.target) for p in result.untracked] == [(4, "socket:[1234]")]
+        assert result.stale == [5]
+
+    def test_targets_only_resolved_for_new_entries(self):
+        """Test that links are only read for file descriptors not seen previously."""
+        # Arrange
+        first = self.scanner.scan(set())
+        self._link(6, "pipe:[42]")
+
+        # Act
+        with patch("os.readlink", wraps=os.readlink) as readlink:
+            second = self.scanner.scan(set())
+
+        # Assert
+        readlink.assert_called_once()
+        first_seen = {p.fd: p.first_seen for p in first.untracked}
+        assert {p.fd: p.first_seen for p in second.untracked if p.fd != 6} == first_seen
+        assert sorted(p.fd for p in second.untracked) == [3, 4, 6]
+
+    def test_closed_entries_forgotten(self):
+        """Test that entries which disappear are removed from the seen entries."""
+        # Arrange
+        self.scanner.scan(set())
+        os.unlink(self.dir / "4")
+
+        # Act
+        result = self.scanner.scan(set())
+
+        # Assert
+        assert [p.fd for p in result.untracked] == [3]
+        assert set(self.scanner.seen) == {3}
+
+    def test_ignore_open(self):
+        """Test that file descriptors open when ignored are not reported until reused."""
+        # Arrange
+        self.scanner.ignore_open()
+        self._link(5, "pipe:[42]")
+
+        # Act
+        first = self.scanner.scan(set())
+        os.unlink(self.dir / "4")
+        self.scanner.scan(set())
+        self._link(4, "socket:[5678]")
+        reused = self.scanner.scan(set())
+
+        # Assert
+        assert [p.fd for p in first.untracked] == [5]
+        assert sorted(p.fd for p in reused.untracked) == [4, 5]
+        assert self.scanner.ignored == {3}
+
+    def test_ignore_subject(self):
+        """Test ignoring the file descriptor of a subject or an integer file descriptor."""
+        # Arrange
+        sock = MagicMock()
+        sock.fileno.return_value = 4
+        closed = MagicMock()
+        closed.fileno.side_effect = ValueError()
+
+        # Act
+        for subject in (sock, closed, 3):
+            self.scanner.ignore(subject)
+        result = self.scanner.scan(set())
+
+        # Assert
+        assert self.scanner.ignored == {3, 4}
+        assert not result.untracked
+
+    def test_ignored_while_listing_kept(self):
+        """Test that a file descriptor ignored during a scan is kept though it was not listed."""
+        # Arrange
+        original_scandir = os.scandir
+
+        def scandir(path):
+            self.scanner.ignore(6)  # Opened and ignored after the directory was listed
+            return original_scandir(path)
+
+        # Act
+        with patch("os.scandir", scandir):
+            self.scanner.scan(set())
+
+        # Assert
+        assert self.scanner.ignored == {6}
+
+    @pytest.mark.skipif(
+        not os.path.isdir("/proc/self/fd"), reason="/proc is not available"
+    )
+    def test_scan_proc(self):
+        """Test scanning the real /proc/self/fd, which lists the scanning descriptor itself."""
+        # Arrange
+        scanner = ProcFdScanner()
+        read_fd, write_fd = os.pipe()
+
+        # Act
+        result = scanner.scan({read_fd})
+
+        # Assert
+        untracked = {p.fd: p.target for p in result.untracked}
+        assert write_fd in untracked
+        assert read_fd not in untracked
+        assert not any(target.endswith("/fd") for target in untracked.values())
+        os.close(read_fd)
+        os.close(write_fd)
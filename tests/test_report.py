@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from fdleaky.dir_fd_info_store import DirFdInfoStore
+from fdleaky.fd_info import FdInfo
+from fdleaky.report import build_report, format_age, get_fingerprint, main
+
+
+class TestReport:
+    """Unit tests for the offline report of a DirFdInfoStore directory."""
+
+    @pytest.fixture(autouse=True)
+    def setup_dir(self, tmp_path):
+        """Set up a store directory with FdInfo objects from two sites."""
+        self.dir = tmp_path
+        store = DirFdInfoStore(dir=tmp_path)
+        now = datetime.now()
+        self.stacks = [["  File a.py, line 1\n"], ["  File b.py, line 2\n"]]
+        for age in (30, 120, 7200):
+            store.create(FdInfo("a.py", self.stacks[0], now - timedelta(seconds=age)))
+        store.create(FdInfo("a.py", self.stacks[1], now - timedelta(seconds=5)))
+        store.create(FdInfo("b.py", self.stacks[1], now - timedelta(days=2)))
+        (tmp_path / "partial.json").write_text("{")
+
+    @pytest.mark.parametrize("num_workers", [1, 2])
+    def test_group_by_identifier(self, num_workers):
+        """Test that records are grouped by identifier, in or out of process."""
+        # Act
+        report = build_report(str(self.dir), num_workers=num_workers, batch_size=2)
+
+        # Assert
+        assert report.num_records == 5
+        assert report.num_errors == 1
+        top = report.get_top(1)[0]
+        assert (top.identifier, top.count) == ("a.py", 4)
+        assert top.ages == [2, 1, 0, 1, 0]
+        assert top.stack == self.stacks[0]  # That of the oldest
+
+    def test_group_by_stack(self):
+        """Test that records are grouped by a fingerprint of their full stack."""
+        # Act
+        report = build_report(str(self.dir), "stack", num_workers=1)
+
+        # Assert
+        assert {key: s.count for key, s in report.groups.items()} == {
+            get_fingerprint(self.stacks[0]): 3,
+            get_fingerprint(self.stacks[1]): 2,
+        }
+
+    def test_max_groups(self):
+        """Test that records beyond max_groups are counted but not grouped."""
+        # Act
+        report = build_report(str(self.dir), num_workers=1, max_groups=1)
+
+        # Assert
+        assert len(report.groups) == 1
+        assert report.num_records == 5
+        assert report.num_ungrouped == 5 - report.get_top(1)[0].count
+
+    def test_main(self, capsys):
+        """Test that the top groups are printed with their representative stack."""
+        # Act
+        main([str(self.dir), "--workers", "1", "--top", "1"])
+
+        # Assert
+        out = capsys.readouterr().out
+        assert out.startswith("5 records in 2 groups\n1 files could not be read\n")
+        assert "#1: 4 records, oldest 2.0h" in out
+        assert "  Ages: <1m: 2, <10m: 1, <1h: 0, <1d: 1, >=1d: 0" in out
+        assert "    File a.py, line 1" in out
+        assert "#2" not in out
+
+    def test_format_age(self):
+        """Test that ages are formatted in a suitable unit."""
+        assert [format_age(s) for s in (5, 90, 5400, 172800)] == [
+            "5.0s",
+            "1.5m",
+            "1.5h",
+            "2.0d",
+        ]
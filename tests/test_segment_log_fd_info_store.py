@@ -0,0 +1,140 @@
+import datetime
+import json
+
+import pytest
+
+from fdleaky.fd_info import FdInfo
+from fdleaky.segment_log_fd_info_store import SegmentLogFdInfoStore
+
+
+def _fd_info(index: int) -> FdInfo:
+    return FdInfo(
+        identifier=f"identifier {index}",
+        stack=["line1", "line2"],
+        created_at=datetime.datetime(2023, 1, 1, 12, 0, index),
+        id=f"id-{index}",
+    )
+
+
+class TestSegmentLogFdInfoStore:
+    """Unit tests for the SegmentLogFdInfoStore class."""
+
+    @pytest.fixture(autouse=True)
+    def setup_store(self, tmp_path):
+        """Set up a store writing to a temporary directory."""
+        self.dir = tmp_path / "log"
+        self.store = SegmentLogFdInfoStore(dir=self.dir)
+        yield
+        self.store.close()
+
+    def _segment_names(self) -> list[str]:
+        return sorted(path.name for path in self.dir.iterdir())
+
+    def test_records_buffered_until_flush(self):
+        """Test that records are only written when the store is flushed."""
+        # Act
+        self.store.create(_fd_info(1))
+
+        # Assert
+        segment = self.dir / "segment-00000000.log"
+        assert segment.read_bytes() == b""
+        self.store.flush()
+        record = json.loads(segment.read_bytes())
+        assert record == {
+            "op": "create",
+            "id": "id-1",
+            "identifier": "identifier 1",
+            "stack": ["line1", "line2"],
+            "created_at": "2023-01-01T12:00:01",
+        }
+
+    def test_read_all(self):
+        """Test rebuilding the live FdInfo objects from the log."""
+        # Arrange
+        for index in range(3):
+            self.store.create(_fd_info(index))
+
+        # Act
+        deleted = self.store.delete("id-1")
+        result = self.store.read_all()
+
+        # Assert
+        assert deleted
+        assert result == {"id-0": _fd_info(0), "id-2": _fd_info(2)}
+
+    def test_delete_unknown(self):
+        """Test that deleting an unknown id writes nothing and returns False."""
+        # Arrange
+        self.store.create(_fd_info(1))
+        self.store.delete("id-1")
+
+        # Act
+        result = self.store.delete("id-1")
+
+        # Assert
+        assert not result
+        self.store.flush()
+        lines = (self.dir / "segment-00000000.log").read_bytes().splitlines()
+        assert len(lines) == 2
+
+    def test_rotate_and_compact(self):
+        """Test that segments rotate, and are compacted once there are too many."""
+        # Arrange
+        self.store.max_segment_size = 200
+        self.store.max_segments = 3
+
+        # Act - each create fills a segment, then is deleted
+        for index in range(2):
+            self.store.create(_fd_info(index))
+            self.store.delete(f"id-{index}")
+        self.store.create(_fd_info(2))
+        rotated = self._segment_names()
+        self.store.create(_fd_info(3))
+
+        # Assert
+        assert rotated == [
+            "segment-00000000.log",
+            "segment-00000001.log",
+            "segment-00000002.log",
+        ]
+        assert self._segment_names() == ["segment-00000003.log"]
+        assert self.store.read_all() == {"id-2": _fd_info(2), "id-3": _fd_info(3)}
+        lines = (self.dir / "segment-00000003.log").read_bytes().splitlines()
+        assert len(lines) == 2
+
+    def test_compact(self):
+        """Test that compaction drops create / delete pairs."""
+        # Arrange
+        for index in range(10):
+            self.store.create(_fd_info(index))
+            if index % 2:
+                self.store.delete(f"id-{index}")
+
+        # Act
+        self.store.compact()
+
+        # Assert
+        assert self._segment_names() == ["segment-00000001.log"]
+        expected = {f"id-{index}": _fd_info(index) for index in range(0, 10, 2)}
+        assert self.store.read_all() == expected
+
+    def test_resume(self):
+        """Test that a new store resumes an existing log in a new segment."""
+        # Arrange
+        self.store.create(_fd_info(1))
+        self.store.create(_fd_info(2))
+        self.store.close()
+        with open(self.dir / "segment-00000000.log", "ab") as file:
+            file.write(b'{"op":"create","id":"trunc')
+
+        # Act
+        store = SegmentLogFdInfoStore(dir=self.dir)
+        deleted = store.delete("id-1")
+        store.create(_fd_info(3))
+        result = store.read_all()
+        store.close()
+
+        # Assert
+        assert deleted
+        assert result == {"id-2": _fd_info(2), "id-3": _fd_info(3)}
+        assert self._segment_names() == ["segment-00000000.log", "segment-00000001.log"]
@@ -0,0 +1,92 @@
+import threading
+
+import pytest
+
+from fdleaky.sharded_dict import ShardedDict
+
+
+class TestShardedDict:
+    """Unit tests for the ShardedDict class."""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method."""
+        self.store = ShardedDict(num_shards=4)
+
+    def test_set_get_and_delete(self):
+        """Test the basic mapping operations."""
+        # Act
+        for key in range(0, 1000, 16):
+            self.store[key] = str(key)
+        del self.store[0]
+
+        # Assert
+        assert len(self.store) == 62
+        assert self.store[16] == "16"
+        assert self.store.get(0) is None
+        assert 32 in self.store
+        assert sorted(self.store) == list(range(16, 1000, 16))
+        with pytest.raises(KeyError):
+            del self.store[0]
+
+    def test_keys_spread_across_shards(self):
+        """Test that aligned keys such as object ids are spread across shards."""
+        # Act
+        for key in range(0, 1024, 16):
+            self.store[key] = key
+
+        # Assert
+        assert all(len(shard) == 16 for shard in self.store._shards)
+
+    def test_pop(self):
+        """Test popping keys with and without a default."""
+        # Arrange
+        self.store[1] = "one"
+
+        # Act / Assert
+        assert self.store.pop(1) == "one"
+        assert self.store.pop(1, None) is None
+        with pytest.raises(KeyError):
+            self.store.pop(1)
+
+    def test_invalid_num_shards(self):
+        """Test that the number of shards must be a power of 2."""
+        with pytest.raises(ValueError):
+            ShardedDict(num_shards=3)
+
+    def test_snapshot(self):
+        """Test that a snapshot is a copy not affected by later changes."""
+        # Arrange
+        self.store[1] = "one"
+        self.store[2] = "two"
+
+        # Act
+        snapshot = self.store.snapshot()
+        del self.store[1]
+
+        # Assert
+        assert snapshot == {1: "one", 2: "two"}
+
+    def test_concurrent_updates(self):
+        """Test that concurrent updates from many threads are not lost."""
+
+        # Arrange
+        def update(offset: int):
+            for key in range(offset, offset + 10_000):
+                self.store[key] = key
+                if key % 2:
+                    self.store.pop(key)
+
+        threads = [
+            threading.Thread(target=update, args=(i * 10_000,)) for i in range(4)
+        ]
+
+        # Act
+        for thread in threads:
+            thread.start()
+        snapshots = [len(self.store.snapshot()) for _ in range(10)]
+        for thread in threads:
+            thread.join()
+
+        # Assert
+        assert len(self.store) == 20_000
+        assert all(size <= 40_000 for size in snapshots)
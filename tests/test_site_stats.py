@@ -0,0 +1,82 @@
+import sys
+import threading
+
+from fdleaky.site_stats import (
+    NUM_LIFETIME_BUCKETS,
+    SiteStatsCollector,
+    get_lifetime_bucket_limits,
+)
+
+
+class TestSiteStatsCollector:
+    """Unit tests for the SiteStatsCollector class."""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method."""
+        self.collector = SiteStatsCollector()
+
+    def test_counts(self):
+        """Test counting opens and closes, and the gauge of open file descriptors."""
+        # Act
+        for _ in range(3):
+            self.collector.on_open(1)
+        self.collector.on_close(1, 0.5)
+        self.collector.on_open(2)
+
+        # Assert
+        stats = self.collector.sites[1]
+        assert (stats.num_opened, stats.num_closed, stats.num_open) == (3, 1, 2)
+        assert self.collector.sites[2].num_open == 1
+
+    def test_lifetime_buckets(self):
+        """Test that lifetimes are counted in power of 2 millisecond buckets."""
+        # Arrange
+        self.collector.on_open(1)
+        limits = get_lifetime_bucket_limits()
+
+        # Act
+        for lifetime in (0.0005, 0.001, 0.0015, 0.003, 1.0, 10**9, -1):
+            self.collector.on_close(1, lifetime)
+
+        # Assert
+        lifetimes = self.collector.sites[1].lifetimes
+        assert len(lifetimes) == len(limits) == NUM_LIFETIME_BUCKETS
+        assert lifetimes[0] == 2  # Under 1ms, including the negative lifetime
+        assert lifetimes[1] == 2  # 1ms up to 2ms
+        assert lifetimes[2] == 1  # 2ms up to 4ms
+        assert lifetimes[10] == 1  # 1s is in 512ms up to 1024ms
+        assert limits[10] == 1.024
+        assert lifetimes[-1] == 1
+        assert limits[-1] == float("inf")
+
+    def test_close_unknown_site(self):
+        """Test that closes for sites never opened are ignored."""
+        self.collector.on_close(1, 1.0)
+        assert not self.collector.sites
+
+    def test_concurrent_updates(self):
+        """Test that no counts are lost when sites are updated from many threads."""
+
+        # Arrange
+        def open_and_close():
+            for _ in range(5000):
+                self.collector.on_open(1)
+                self.collector.on_close(1, 0)
+
+        threads = [threading.Thread(target=open_and_close) for _ in range(8)]
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+
+        # Act
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(switch_interval)
+
+        # Assert
+        stats = self.collector.sites[1]
+        assert (stats.num_opened, stats.num_closed) == (40000, 40000)
+        assert stats.lifetimes[0] == 40000
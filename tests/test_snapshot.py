@@ -0,0 +1,52 @@
+import pytest
+
+from fdleaky.snapshot import SiteDiff, Snapshot
+from fdleaky.stack import stack_table
+
+
+class TestSnapshot:
+    """Unit tests for the Snapshot class."""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method."""
+        self.site_ids = [stack_table.intern((f"site{i}\n",)) for i in range(4)]
+        self.before = Snapshot({self.site_ids[0]: 5, self.site_ids[1]: 2}, 1000.0)
+
+    def test_immutable(self):
+        """Test that a snapshot can not be modified, even through the mapping given."""
+        # Arrange
+        sites = {self.site_ids[0]: 1}
+        snapshot = Snapshot(sites, 1000.0)
+
+        # Act
+        sites[self.site_ids[1]] = 1
+
+        # Assert
+        assert dict(snapshot.sites) == {self.site_ids[0]: 1}
+        with pytest.raises(TypeError):
+            snapshot.sites[self.site_ids[1]] = 1
+
+    def test_compare_to(self):
+        """Test that only sites which grew are returned, largest increase first."""
+        # Arrange
+        after = Snapshot(
+            {
+                self.site_ids[0]: 4,
+                self.site_ids[1]: 5,
+                self.site_ids[2]: 1,
+                self.site_ids[3]: 3,
+            },
+            1010.0,
+        )
+
+        # Act
+        diffs = after.compare_to(self.before)
+
+        # Assert
+        assert diffs == [
+            SiteDiff(self.site_ids[1], 5, 3),
+            SiteDiff(self.site_ids[3], 3, 3),
+            SiteDiff(self.site_ids[2], 1, 1),
+        ]
+        assert diffs[0].site == "site1"
+        assert after.num_open == 13
@@ -0,0 +1,112 @@
+import datetime
+import sqlite3
+
+import pytest
+
+from fdleaky.fd_info import FdInfo
+from fdleaky.sqlite_fd_info_store import SqliteFdInfoStore
+
+
+def _fd_info(index: int, stack: list[str] | None = None) -> FdInfo:
+    return FdInfo(
+        identifier=f"identifier {index}",
+        stack=stack or ["line1", "line2"],
+        created_at=datetime.datetime(2023, 1, 1, 12, 0, index),
+        id=f"id-{index}",
+    )
+
+
+class TestSqliteFdInfoStore:
+    """Unit tests for the SqliteFdInfoStore class."""
+
+    @pytest.fixture(autouse=True)
+    def setup_store(self, tmp_path):
+        """Set up a store using a temporary database."""
+        self.path = tmp_path / "fdleaky.db"
+        self.store = SqliteFdInfoStore(path=self.path)
+        yield
+        self.store.close()
+
+    def _count(self, table: str) -> int:
+        with sqlite3.connect(self.path) as connection:
+            return connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def test_wal_mode(self):
+        """Test that the database uses write ahead logging."""
+        # Act
+        self.store.create(_fd_info(1))
+        self.store.flush()
+
+        # Assert
+        with sqlite3.connect(self.path) as connection:
+            assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    def test_changes_committed_on_flush(self):
+        """Test that changes are only visible to other connections once flushed."""
+        # Arrange
+        self.store.create(_fd_info(1))
+
+        # Act
+        before_flush = self._count("fd_info")
+        self.store.flush()
+
+        # Assert
+        assert before_flush == 0
+        assert self._count("fd_info") == 1
+
+    def test_read_all(self):
+        """Test reading back stored FdInfo objects after a delete."""
+        # Arrange
+        for index in range(3):
+            self.store.create(_fd_info(index))
+
+        # Act
+        deleted = self.store.delete("id-1")
+        result = self.store.read_all()
+
+        # Assert
+        assert deleted
+        assert result == {"id-0": _fd_info(0), "id-2": _fd_info(2)}
+
+    def test_delete_unknown(self):
+        """Test deleting an id which is not stored."""
+        assert not self.store.delete("unknown")
+
+    def test_stacks_deduplicated(self):
+        """Test that each distinct stack is stored once."""
+        # Act
+        self.store.create(_fd_info(1))
+        self.store.create(_fd_info(2))
+        self.store.create(_fd_info(3, stack=["other"]))
+        self.store.flush()
+
+        # Assert
+        assert self._count("stack") == 2
+        assert self.store.read_all()["id-3"].stack == ["other"]
+
+    def test_indexes(self):
+        """Test that the fd_info table is indexed on identifier and created_at."""
+        # Act
+        self.store.flush()
+        self.store.read_all()
+
+        # Assert
+        with sqlite3.connect(self.path) as connection:
+            rows = connection.execute("PRAGMA index_list(fd_info)").fetchall()
+        assert {"fd_info_identifier", "fd_info_created_at"} <= {row[1] for row in rows}
+
+    def test_reopen(self):
+        """Test that records and stacks are kept when the store is reopened."""
+        # Arrange
+        self.store.create(_fd_info(1))
+        self.store.close()
+
+        # Act
+        store = SqliteFdInfoStore(path=self.path)
+        store.create(_fd_info(2))
+        result = store.read_all()
+        store.close()
+
+        # Assert
+        assert result == {"id-1": _fd_info(1), "id-2": _fd_info(2)}
+        assert self._count("stack") == 1
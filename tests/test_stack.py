@@ -0,0 +1,319 @@
+import os
+import sysconfig
+import threading
+import traceback
+
+import pytest
+
+from fdleaky.stack import (
+    StackTable,
+    capture_frames,
+    capture_stack_id,
+    format_frame,
+    get_call_module,
+    get_call_site,
+    is_in_scope,
+    is_internal_frame,
+    is_stdlib_frame,
+    stack_table,
+    trim_frames,
+)
+
+
+def _capture_both():
+    return traceback.format_stack(), capture_frames()
+
+
+def _capture_from_loop():
+    return [capture_stack_id() for _ in range(3)]
+
+
+_STDLIB = sysconfig.get_paths()["stdlib"]
+_SITE = sysconfig.get_paths()["purelib"]
+_PACKAGE = os.path.dirname(os.path.dirname(__file__)) + "/fdleaky"
+
+
+def _frame(filename: str) -> str:
+    return f'  File "{filename}", line 1, in f\n'
+
+
+def _code_frame(code, lineno: int = 1) -> tuple:
+    return (code, lineno, code.co_filename)
+
+
+def _in_scope(*args) -> bool:
+    return is_in_scope({}, *args)
+
+
+class TestStack:
+    """Unit tests for stack capture and the stack table."""
+
+    def test_capture_frames_outermost_first(self):
+        """Test that the innermost frame captured is that of the caller."""
+        # Act
+        frames = capture_frames()
+
+        # Assert
+        code, lineno, filename = frames[-1]
+        assert code is self.test_capture_frames_outermost_first.__code__
+        assert lineno > code.co_firstlineno
+        assert filename == __file__
+
+    def test_capture_frames_skip(self):
+        """Test that frames may be skipped from the innermost end of the stack."""
+        # Act
+        frames = capture_frames()
+        skipped = (lambda: capture_frames(1))()
+
+        # Assert
+        assert skipped[-1][0] is frames[-1][0]
+        assert len(skipped) == len(frames)
+
+    def test_format_matches_traceback(self):
+        """Test that frames format identically to traceback.format_stack."""
+        # Act
+        expected, frames = _capture_both()
+
+        # Assert
+        assert [format_frame(frame) for frame in frames] == expected
+
+    def test_format_frame_without_source(self):
+        """Test formatting a frame whose source is not available."""
+        # Arrange
+        code = compile("pass", "<no-source>", "exec")
+
+        # Act
+        result = format_frame(_code_frame(code))
+
+        # Assert
+        assert result == '  File "<no-source>", line 1, in <module>\n'
+
+    def test_format_frame_preformatted(self):
+        """Test that frames which are already strings are returned as is."""
+        assert format_frame("already formatted") == "already formatted"
+
+    def test_identical_stacks_interned_once(self):
+        """Test that identical stacks share a single id."""
+        # Act
+        ids = _capture_from_loop()
+
+        # Assert
+        assert len(set(ids)) == 1
+
+    def test_different_stacks_have_different_ids(self):
+        """Test that different stacks are given different ids."""
+        # Arrange
+        table = StackTable()
+
+        # Act
+        first = table.intern(("a", "b"))
+        second = table.intern(("a", "c"))
+
+        # Assert
+        assert first != second
+        assert table.get_frames(first) == ("a", "b")
+        assert table.get_stack(second) == ["a", "c"]
+        assert len(table) == 2
+
+    def test_frames_formatted_once(self):
+        """Test that each unique frame is formatted only once per table."""
+        # Arrange
+        table = StackTable()
+        stack_id = table.intern(capture_frames())
+
+        # Act
+        first = table.get_stack(stack_id)
+        second = table.get_stack(stack_id)
+
+        # Assert
+        assert first == second
+        assert all(a is b for a, b in zip(first, second))
+
+    def test_capture_stack_id(self):
+        """Test capturing a stack into the global stack table."""
+        # Act
+        stack_id = capture_stack_id()
+
+        # Assert
+        assert "test_capture_stack_id" in stack_table.get_stack(stack_id)[-1]
+
+    def test_get_call_site(self):
+        """Test that the call site is the innermost frame outside of fdleaky."""
+        # Act
+        code, _, _ = get_call_site()
+
+        # Assert
+        assert code is self.test_get_call_site.__code__
+        assert not is_internal_frame(_code_frame(code))
+
+    def test_get_call_module(self):
+        """Test that the call module is that of the innermost frame outside of fdleaky."""
+        assert get_call_module() == __name__
+
+    def test_get_site_id(self):
+        """Test that the site of a stack skips frames which are part of fdleaky."""
+        # Arrange
+        table = StackTable()
+        internal = capture_frames.__code__
+        stack_id = table.intern((("a"), _code_frame(internal)))
+
+        # Act
+        site_id = table.get_site_id(stack_id)
+
+        # Assert
+        assert table.get_frames(site_id) == ("a",)
+        assert table.get_site_id(site_id) == site_id
+
+    def test_intern_with_site_id(self):
+        """Test that an explicit site id is used instead of deriving one."""
+        # Arrange
+        table = StackTable()
+        site_id = table.intern(("site",))
+
+        # Act
+        stack_id = table.intern(("other", "frames"), site_id)
+
+        # Assert
+        assert table.get_site_id(stack_id) == site_id
+
+    def test_is_internal_frame_formatted(self):
+        """Test detecting internal frames which have already been formatted."""
+        # Arrange
+        frame = format_frame(_code_frame(capture_frames.__code__))
+
+        # Act / Assert
+        assert is_internal_frame(frame)
+        assert not is_internal_frame('  File "/app/main.py", line 1, in <module>\n')
+
+    def test_is_stdlib_frame(self):
+        """Test detecting standard library frames, excluding installed packages."""
+        assert is_stdlib_frame(_frame(f"{_STDLIB}/asyncio/events.py"))
+        assert is_stdlib_frame(_frame("<frozen runpy>"))
+        assert not is_stdlib_frame(_frame(f"{_SITE}/uvicorn/main.py"))
+        assert not is_stdlib_frame(_frame("/app/main.py"))
+        assert is_stdlib_frame(_code_frame(threading.Thread.run.__code__))
+        assert not is_stdlib_frame(_code_frame(self.test_is_stdlib_frame.__code__))
+
+    def test_trim_frames(self):
+        """Test removing fdleaky frames and standard library frames outside the application."""
+        # Arrange
+        frames = (
+            _frame("<frozen runpy>"),
+            _frame("/app/main.py"),
+            _frame(f"{_STDLIB}/asyncio/base_events.py"),
+            _frame(f"{_STDLIB}/asyncio/events.py"),
+            _frame("/app/handler.py"),
+            _frame(f"{_STDLIB}/socket.py"),
+            _frame(f"{_PACKAGE}/fd_tracker.py"),
+        )
+
+        # Act
+        result = trim_frames(frames)
+
+        # Assert
+        assert result == (frames[1], frames[4], frames[5])
+
+    def test_trim_frames_only_stdlib(self):
+        """Test that standard library frames are kept if there is no application frame."""
+        frames = (_frame(f"{_STDLIB}/threading.py"), _frame(f"{_STDLIB}/socket.py"))
+        assert trim_frames(frames) == frames
+
+    def test_get_trimmed_id(self):
+        """Test that trimmed stacks are interned and memoized."""
+        # Arrange
+        table = StackTable()
+        stack_id = table.intern((_frame("<frozen runpy>"), _frame("/app/main.py")))
+
+        # Act
+        trimmed_id = table.get_trimmed_id(stack_id)
+
+        # Assert
+        assert table.get_frames(trimmed_id) == (_frame("/app/main.py"),)
+        assert table.get_trimmed_id(stack_id) == trimmed_id
+        assert table.get_trimmed_id(trimmed_id) == trimmed_id
+
+    def test_is_in_scope(self):
+        """Test checking the innermost frames for packages and path prefixes."""
+        assert _in_scope(("tests.",), (), 2)
+        assert _in_scope((), (os.path.dirname(__file__),), 2)
+        assert not _in_scope(("other.",), ("/other",), 64)
+        # The packages are compared with trailing dots, so "test" does not match "tests"
+        assert not _in_scope(("test.",), (), 64)
+
+    def test_is_in_scope_bounded(self):
+        """Test that only the innermost max_depth frames are checked."""
+        # In a thread, the frame for threading is outside those for _in_scope and the lambda
+        threading_prefix = (threading.__file__,)
+        assert not _in_scope((), threading_prefix, 2)
+        result = []
+        thread = threading.Thread(
+            target=lambda: result.append(_in_scope((), threading_prefix, 4))
+        )
+        thread.start()
+        thread.join()
+        assert result == [True]
+
+    def test_is_in_scope_cached(self):
+        """Test that the result for each code object is cached."""
+        # Arrange
+        scope = {}
+
+        # Act
+        result = is_in_scope(scope, ("tests.",), (), 1)
+
+        # Assert
+        assert result
+        code = self.test_is_in_scope_cached.__code__
+        assert scope == {id(code): (code, True)}
+
+
+class TestStackIdenticalCode:
+    """Regression tests for identical functions defined in different files."""
+
+    @pytest.fixture(autouse=True)
+    def setup_functions(self, tmp_path):
+        """Set up two modules each defining the same function."""
+        source = "def opener(f):\n    return f()\n"
+        self.paths = [str(tmp_path / "a_mod.py"), str(tmp_path / "b_mod.py")]
+        self.openers = []
+        for path in self.paths:
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(source)
+            namespace = {"__name__": os.path.basename(path)[:-3]}
+            exec(compile(source, path, "exec"), namespace)  # pylint: disable=W0122
+            self.openers.append(namespace["opener"])
+
+    def test_code_objects_compare_equal(self):
+        """Test the premise - code objects from different files compare equal."""
+        assert self.openers[0].__code__ == self.openers[1].__code__
+
+    def test_stacks_distinct(self):
+        """Test that stacks through each file have distinct ids and format their own file."""
+        # Arrange
+        table = StackTable()
+
+        # Act
+        stack_ids = [
+            table.intern(opener(lambda: capture_frames()[-2:]))
+            for opener in self.openers
+        ]
+
+        # Assert
+        assert stack_ids[0] != stack_ids[1]
+        for stack_id, path in zip(stack_ids, self.paths):
+            assert f'File "{path}"' in table.get_stack(stack_id)[0]
+
+    def test_scope_distinct(self):
+        """Test that the scope cached for one file is not used for the other."""
+        # Arrange
+        scope = {}
+        prefixes = (self.paths[0],)
+
+        # Act
+        results = [
+            opener(lambda: is_in_scope(scope, (), prefixes, 2))
+            for opener in self.openers
+        ]
+
+        # Assert
+        assert results == [True, False]
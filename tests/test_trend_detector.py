@@ -0,0 +1,79 @@
+from fdleaky.site_stats import SiteStats
+from fdleaky.trend_detector import TrendDetector
+
+
+class TestTrendDetector:
+    """Unit tests for the TrendDetector class."""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method."""
+        self.detector = TrendDetector(min_slope=0.1, min_samples=5, max_sites=3)
+        self.sites = {}
+
+    def _set_open(self, site_id: int, num_open: int):
+        self.sites[site_id] = SiteStats(num_opened=num_open)
+
+    def test_growing_site_flagged(self):
+        """Test that a site whose open count grows steadily is flagged once sampled enough."""
+        # Act
+        results = []
+        for tick in range(10):
+            self._set_open(1, 10 + tick)  # One more every 5 seconds
+            self._set_open(2, 10 + tick % 2)  # Fluctuating
+            results.append(self.detector.sample(self.sites, tick * 5.0))
+
+        # Assert
+        assert results[:5] == [set()] * 5
+        assert results[5:] == [{1}] * 5
+        assert 0.1 < self.detector.trends[1].slope < 0.2
+
+    def test_shrinking_site_not_flagged(self):
+        """Test that the slope follows a site which stops growing."""
+        # Arrange
+        for tick in range(10):
+            self._set_open(1, 10 + tick * 5)
+            self.detector.sample(self.sites, tick)
+
+        # Act
+        results = []
+        for tick in range(10, 30):
+            results.append(self.detector.sample(self.sites, tick))
+
+        # Assert
+        assert results[0] == {1}
+        assert results[-1] == set()
+
+    def test_bounded_sites(self):
+        """Test that trends are kept for at most max_sites sites, admitting new sites."""
+        # Arrange
+        for site_id in range(5):
+            self._set_open(site_id, 1)
+
+        # Act
+        self.detector.sample(self.sites, 0)
+        tracked = set(self.detector.trends)
+        self._set_open(0, 0)
+        self.detector.sample(self.sites, 1)
+
+        # Assert
+        assert tracked == {0, 1, 2}
+        assert set(self.detector.trends) == {2, 3, 4}
+
+    def test_new_site_evicts_lowest_slope(self):
+        """Test that a new site replaces the flattest trend while every site has fds open."""
+        # Arrange
+        for site_id in range(3):
+            self._set_open(site_id, 10)
+        self.detector.sample(self.sites, 0)
+        self._set_open(0, 20)
+        self._set_open(1, 5)
+        self._set_open(2, 15)
+        self.detector.sample(self.sites, 10)
+
+        # Act
+        self._set_open(3, 1)
+        self.detector.sample(self.sites, 20)
+
+        # Assert
+        assert set(self.detector.trends) == {0, 2, 3}
+        assert self.detector.trends[3].num_samples == 0
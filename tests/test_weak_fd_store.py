@@ -0,0 +1,102 @@
+import gc
+from unittest.mock import MagicMock
+
+import pytest
+
+from fdleaky.weak_fd_store import WeakFdStore
+from fdleaky.fd import Fd
+from fdleaky.stack import stack_table
+
+
+class TestWeakFdStore:
+    """Unit tests for the WeakFdStore class."""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method."""
+        self.store = WeakFdStore()
+        self.stack_id = stack_table.intern(("stack1", "stack2"))
+
+    def test_set_and_get(self):
+        """Test that an fd read from the store matches the one stored."""
+        # Arrange
+        subject = MagicMock()
+        fd = Fd(subject, self.stack_id, created_at=123.5)
+
+        # Act
+        self.store[1] = fd
+
+        # Assert
+        assert self.store[1] == fd
+        assert self.store.get(2) is None
+        assert len(self.store) == 1
+        assert list(self.store) == [1]
+
+    def test_subject_held_weakly(self):
+        """Test that the store does not keep a subject alive."""
+        # Arrange
+        self.store[1] = Fd(MagicMock(), self.stack_id)
+
+        # Act
+        gc.collect()
+
+        # Assert
+        assert self.store[1].subject is None
+        assert self.store[1].stack_id == self.stack_id
+
+    def test_subject_without_weakref_support(self):
+        """Test that subjects which do not support weak references are held directly."""
+        # Act
+        self.store[1] = Fd("subject", self.stack_id)
+
+        # Assert
+        assert self.store[1].subject == "subject"
+
+    def test_pop(self):
+        """Test that popping an fd returns it and removes it from the store."""
+        # Arrange
+        self.store[1] = Fd("first", self.stack_id, created_at=1)
+        self.store[2] = Fd("second", self.stack_id, created_at=2)
+
+        # Act
+        popped = self.store.pop(1)
+
+        # Assert
+        assert popped.subject == "first"
+        assert list(self.store) == [2]
+        with pytest.raises(KeyError):
+            self.store[1]  # pylint: disable=W0104
+
+    def test_overwrite(self):
+        """Test that storing an fd under an existing key replaces it."""
+        # Arrange
+        subject = MagicMock()
+        self.store[1] = Fd(MagicMock(), self.stack_id, created_at=1)
+
+        # Act
+        self.store[1] = Fd(subject, self.stack_id, created_at=2)
+
+        # Assert
+        assert len(self.store) == 1
+        assert self.store[1] == Fd(subject, self.stack_id, created_at=2)
+
+    def test_delete_missing(self):
+        """Test that deleting a missing key raises a KeyError."""
+        with pytest.raises(KeyError):
+            del self.store[1]
+        with pytest.raises(KeyError):
+            self.store.pop(1)
+        assert self.store.pop(1, None) is None
+
+    def test_snapshot(self):
+        """Test that a snapshot is a copy of the store which is not affected by later changes."""
+        # Arrange
+        subject = MagicMock()
+        fd = Fd(subject, self.stack_id, created_at=1.0)
+        self.store[1] = fd
+
+        # Act
+        snapshot = self.store.snapshot()
+        del self.store[1]
+
+        # Assert
+        assert snapshot == {1: fd}
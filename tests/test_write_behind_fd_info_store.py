@@ -0,0 +1,97 @@
+import datetime
+from unittest.mock import MagicMock, call
+
+from fdleaky.fd_info import FdInfo
+from fdleaky.fd_info_store import FdInfoStore
+from fdleaky.write_behind_fd_info_store import WriteBehindFdInfoStore
+
+
+def _fd_info(index: int) -> FdInfo:
+    return FdInfo(
+        identifier=f"identifier {index}",
+        stack=["line1"],
+        created_at=datetime.datetime(2023, 1, 1, 12, 0, index),
+        id=f"id-{index}",
+    )
+
+
+class TestWriteBehindFdInfoStore:
+    """Unit tests for the WriteBehindFdInfoStore class."""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method."""
+        self.mock_store = MagicMock(spec=FdInfoStore)
+        self.store = WriteBehindFdInfoStore(store=self.mock_store, max_pending=3)
+
+    def test_changes_applied_on_flush(self):
+        """Test that changes are only applied to the underlying store when flushed, in order."""
+        # Arrange
+        fd_info = _fd_info(1)
+        self.store.create(fd_info)
+        self.store.delete("id-0")
+
+        # Act
+        self.mock_store.assert_not_called()
+        self.store.flush()
+
+        # Assert
+        assert self.mock_store.mock_calls == [
+            call.create(fd_info),
+            call.delete("id-0"),
+            call.flush(),
+        ]
+
+    def test_create_and_delete_cancel(self):
+        """Test that a delete for a queued create means neither reaches the store."""
+        # Arrange
+        self.store.create(_fd_info(1))
+
+        # Act
+        result = self.store.delete("id-1")
+        self.store.flush()
+
+        # Assert
+        assert result
+        self.mock_store.create.assert_not_called()
+        self.mock_store.delete.assert_not_called()
+        self.mock_store.flush.assert_not_called()
+
+    def test_delete_twice(self):
+        """Test that a second delete for the same id is not queued."""
+        # Act
+        first = self.store.delete("id-1")
+        second = self.store.delete("id-1")
+        self.store.flush()
+
+        # Assert
+        assert first
+        assert not second
+        self.mock_store.delete.assert_called_once_with("id-1")
+
+    def test_overflow_drops_creates(self):
+        """Test that creates beyond max_pending are dropped, while deletes are still queued."""
+        # Arrange
+        for index in range(3):
+            self.store.create(_fd_info(index))
+
+        # Act
+        self.store.create(_fd_info(3))
+        self.store.delete("id-9")
+        self.store.flush()
+
+        # Assert
+        assert self.store.num_dropped == 1
+        assert self.mock_store.create.call_count == 3
+        self.mock_store.delete.assert_called_once_with("id-9")
+
+    def test_close(self):
+        """Test that closing flushes and closes the underlying store."""
+        # Arrange
+        self.store.delete("id-1")
+
+        # Act
+        self.store.close()
+
+        # Assert
+        self.mock_store.delete.assert_called_once_with("id-1")
+        self.mock_store.close.assert_called_once_with()